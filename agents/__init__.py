@@ -1,15 +1,35 @@
 """
 Multi-Agent Framework using LangGraph
 """
-from agents.error_classification_agent import ErrorClassificationAgent
-from agents.solution_agent import SolutionAgent
-from agents.notification_agent import NotificationAgent
-from agents.agent_orchestrator import MultiAgentOrchestrator
+import importlib
+
+# Agents are imported on first attribute access (PEP 562) so that importing the
+# package does not pull in langchain/langgraph for callers that never use them
+_LAZY_EXPORTS = {
+    'ErrorClassificationAgent': 'agents.error_classification_agent',
+    'SolutionAgent': 'agents.solution_agent',
+    'NotificationAgent': 'agents.notification_agent',
+    'MultiAgentOrchestrator': 'agents.agent_orchestrator',
+    'get_orchestrator': 'agents.agent_orchestrator',
+}
 
 __all__ = [
     'ErrorClassificationAgent',
     'SolutionAgent',
     'NotificationAgent',
-    'MultiAgentOrchestrator'
+    'MultiAgentOrchestrator',
+    'get_orchestrator'
 ]
 
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # Cache so later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -2,25 +2,36 @@
 LangGraph-based Multi-Agent Orchestrator
 Coordinates the three agents: Error Classification, Solution Finding, and Notification
 """
-from typing import Dict, List, Any, Optional, TypedDict, Annotated
-from langgraph.graph import StateGraph, END
-from langgraph.graph.message import add_messages
+from typing import Dict, List, Any, Optional, TypedDict, Annotated, TYPE_CHECKING
+import asyncio
+import hashlib
 import operator
+import threading
+import weakref
+from collections import OrderedDict
+from types import MappingProxyType
+
+import orjson
 
 from agents.error_classification_agent import ErrorClassificationAgent
 from agents.solution_agent import SolutionAgent
 from agents.notification_agent import NotificationAgent
 
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
+
 
 class AgentState(TypedDict):
     """State shared between agents"""
     # Input
     log_files: List[Dict[str, str]]  # List of {filename, content}
+    content_head: str  # First LOG_HEAD_CHARS of the first log file, for notifications
     api_key: str
     
     # Error Classification Agent output
     classification_result: Optional[Dict[str, Any]]
     aggregated_errors: Optional[Dict[str, Any]]
+    top_error: Optional[Dict[str, Any]]  # {type, details, severity} of the most frequent error
     
     # Solution Agent output
     solutions: Optional[List[Dict[str, Any]]]
@@ -31,23 +42,103 @@ class AgentState(TypedDict):
     
     # Metadata
     current_step: str
-    errors: List[str]
+    errors: Annotated[List[str], operator.add]  # Nodes return only their new errors
+
+
+# Every AgentState key with its starting value; entry points override the inputs.
+# Read-only so the shared template can't be mutated (errors is re-created per run).
+_EMPTY_STATE = MappingProxyType({
+    "log_files": [],
+    "content_head": "",
+    "api_key": "",
+    "classification_result": None,
+    "aggregated_errors": None,
+    "top_error": None,
+    "solutions": None,
+    "selected_solution": None,
+    "notification_results": None,
+    "current_step": "initialized",
+    "errors": []
+})
+
+# Characters of the first log file attached to JIRA tickets
+LOG_HEAD_CHARS = 5000
+
+# Timeout (seconds) for LLM requests made through the shared HTTP clients
+LLM_HTTP_TIMEOUT = 60.0
+
+# Distinct configurations kept by get_orchestrator before the oldest is dropped
+MAX_CACHED_ORCHESTRATORS = 4
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop running on a daemon thread, shared by the synchronous entry points"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="agent-orchestrator-loop", daemon=True).start()
+    return _loop
+
+
+def _run_sync(coro):
+    """Run a coroutine on the background loop and block until it completes.
+
+    A single long-lived loop (rather than asyncio.run per call) keeps the LLM
+    clients' async connection pools bound to one loop across workflow runs.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
 
 
 class MultiAgentOrchestrator:
     """Orchestrates the multi-agent workflow using LangGraph"""
     
     def __init__(self, api_key: str, slack_webhook: Optional[str] = None, jira_config: Optional[Dict] = None):
+        import httpx
+        
         self.api_key = api_key
-        self.classification_agent = ErrorClassificationAgent(api_key)
-        self.solution_agent = SolutionAgent(api_key)
+        
+        # One connection pool to OpenRouter shared by every LLM-backed agent
+        limits = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        self.http_client = httpx.Client(limits=limits, timeout=LLM_HTTP_TIMEOUT)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=LLM_HTTP_TIMEOUT)
+        
+        self.classification_agent = ErrorClassificationAgent(
+            api_key, http_client=self.http_client, http_async_client=self.http_async_client
+        )
+        self.solution_agent = SolutionAgent(
+            api_key, http_client=self.http_client, http_async_client=self.http_async_client
+        )
         self.notification_agent = NotificationAgent(slack_webhook, jira_config)
         
         # Build the graph
         self.workflow = self._build_workflow()
     
-    def _build_workflow(self) -> StateGraph:
+    def close(self) -> None:
+        """Close the shared HTTP connection pools"""
+        self.http_client.close()
+        _run_sync(self.http_async_client.aclose())
+    
+    async def aclose(self) -> None:
+        """Async variant of close"""
+        self.http_client.close()
+        await self.http_async_client.aclose()
+    
+    @staticmethod
+    def _content_head(log_files: List[Dict[str, str]]) -> str:
+        """Head of the first log file, taken once when the files are registered"""
+        if not log_files:
+            return ""
+        return log_files[0].get("content", "")[:LOG_HEAD_CHARS]
+    
+    def _build_workflow(self) -> "CompiledStateGraph":
         """Build the LangGraph workflow"""
+        # langgraph is only needed to build the graph, so import it lazily
+        from langgraph.graph import StateGraph, END
+        
         workflow = StateGraph(AgentState)
         
         # Add nodes
@@ -61,134 +152,141 @@ class MultiAgentOrchestrator:
         workflow.add_edge("find_solutions", "send_notifications")
         workflow.add_edge("send_notifications", END)
         
-        return workflow.compile()
+        # Linear, single-pass pipeline: no checkpointing or interrupts needed
+        return workflow.compile(checkpointer=None)
     
-    def classify_errors_node(self, state: AgentState) -> AgentState:
-        """Node 1: Error Classification Agent"""
+    @staticmethod
+    def _merge(state: AgentState, update: Dict[str, Any]) -> AgentState:
+        """Apply a node's partial update the way the graph does (errors are appended)"""
+        merged = {**state, **update}
+        merged["errors"] = state["errors"] + update.get("errors", [])
+        return merged
+    
+    async def classify_errors_node(self, state: AgentState) -> Dict[str, Any]:
+        """Node 1: Error Classification Agent
+        
+        Like the other nodes, returns only the keys it changes.
+        """
         try:
-            state["current_step"] = "classifying_errors"
+            if not state["log_files"]:
+                return {"current_step": "classifying_errors", "errors": ["No log files provided"]}
             
-            if not state.get("log_files"):
-                state["errors"].append("No log files provided")
-                return state
+            # Process multiple log files concurrently
+            result = await self.classification_agent.aprocess_multiple_logs(state["log_files"])
             
-            # Process multiple log files
-            result = self.classification_agent.process_multiple_logs(state["log_files"])
+            aggregated_errors = result.get("aggregated_errors", {})
+            update = {
+                "classification_result": result,
+                "aggregated_errors": aggregated_errors,
+                # Only the head is needed past this point; don't carry full logs through the graph
+                "log_files": [],
+                "current_step": "classification_complete"
+            }
             
-            state["classification_result"] = result
-            state["aggregated_errors"] = result.get("aggregated_errors", {})
-            state["current_step"] = "classification_complete"
+            # Pick the top error once; downstream nodes read it from state
+            if aggregated_errors:
+                top_type, top_details = max(aggregated_errors.items(), key=lambda x: x[1].get('count', 0))
+                update["top_error"] = {
+                    "type": top_type,
+                    "details": top_details,
+                    "severity": top_details.get('severity', 'Medium')
+                }
+            return update
             
         except Exception as e:
-            state["errors"].append(f"Classification error: {str(e)}")
-            state["current_step"] = "classification_failed"
-        
-        return state
+            return {"current_step": "classification_failed", "errors": [f"Classification error: {str(e)}"]}
     
-    def find_solutions_node(self, state: AgentState) -> AgentState:
+    async def find_solutions_node(self, state: AgentState) -> Dict[str, Any]:
         """Node 2: Solution Finding Agent"""
         try:
-            state["current_step"] = "finding_solutions"
-            
-            classification_result = state.get("classification_result")
+            classification_result = state["classification_result"]
             if not classification_result:
-                state["errors"].append("No classification result available")
-                return state
+                return {"current_step": "finding_solutions", "errors": ["No classification result available"]}
             
             # Get the primary error for solution finding
-            aggregated_errors = state.get("aggregated_errors", {})
-            aggregated_analysis = classification_result.get("aggregated_analysis", {})
+            top_error = state["top_error"]
+            aggregated_analysis = classification_result.get("aggregated_analysis") or {}
             
-            if not aggregated_errors:
-                state["errors"].append("No errors found to generate solutions for")
-                return state
-            
-            # Find top error
-            top_error = max(aggregated_errors.items(), key=lambda x: x[1].get('count', 0))
-            error_type = top_error[0]
-            error_details = top_error[1]
-            severity = error_details.get('severity', 'Medium')
+            if not top_error:
+                return {"current_step": "finding_solutions", "errors": ["No errors found to generate solutions for"]}
             
             # Find solutions
-            solutions = self.solution_agent.find_solutions(
-                error_type=error_type,
-                severity=severity,
-                error_details=error_details,
+            solutions = await self.solution_agent.afind_solutions(
+                error_type=top_error["type"],
+                severity=top_error["severity"],
+                error_details=top_error["details"],
                 aggregated_analysis=aggregated_analysis
             )
             
-            # Rank solutions
-            solutions = self.solution_agent.rank_solutions(solutions)
-            
-            state["solutions"] = solutions
-            state["current_step"] = "solutions_found"
+            # State, UI and notifications work with plain dicts
+            return {
+                "solutions": [solution.to_dict() for solution in solutions],
+                "current_step": "solutions_found"
+            }
             
         except Exception as e:
-            state["errors"].append(f"Solution finding error: {str(e)}")
-            state["current_step"] = "solution_finding_failed"
-        
-        return state
+            return {"current_step": "solution_finding_failed", "errors": [f"Solution finding error: {str(e)}"]}
     
-    def send_notifications_node(self, state: AgentState) -> AgentState:
+    async def send_notifications_node(self, state: AgentState) -> Dict[str, Any]:
         """Node 3: Notification Agent"""
         try:
-            state["current_step"] = "sending_notifications"
-            
-            selected_solution = state.get("selected_solution")
+            selected_solution = state["selected_solution"]
             if not selected_solution:
-                state["errors"].append("No solution selected for notification")
-                state["current_step"] = "notification_skipped"
-                return state
+                return {"current_step": "notification_skipped", "errors": ["No solution selected for notification"]}
             
-            classification_result = state.get("classification_result", {})
-            aggregated_analysis = classification_result.get("aggregated_analysis", {})
+            classification_result = state["classification_result"] or {}
+            aggregated_analysis = classification_result.get("aggregated_analysis") or {}
             
             # Get error information
-            aggregated_errors = state.get("aggregated_errors", {})
-            if aggregated_errors:
-                top_error = max(aggregated_errors.items(), key=lambda x: x[1].get('count', 0))
-                error_type = top_error[0]
-                error_details = top_error[1]
-                severity = error_details.get('severity', 'Medium')
-                
-                # Extract causes from aggregated analysis
+            top_error = state["top_error"]
+            if not top_error:
+                return {"current_step": "notification_skipped", "errors": ["No errors to notify about"]}
+            
+            error_type = top_error["type"]
+            error_details = top_error["details"]
+            severity = top_error["severity"]
+            
+            # Extract causes from aggregated analysis
+            causes = [{
+                'title': finding,
+                'description': finding
+            } for finding in aggregated_analysis.get('key_findings', [])]
+            
+            if not causes:
                 causes = [{
-                    'title': finding,
-                    'description': finding
-                } for finding in aggregated_analysis.get('key_findings', [])]
-                
-                if not causes:
-                    causes = [{
-                        'title': error_type,
-                        'description': f"Error occurred {error_details.get('count', 0)} times"
-                    }]
-                
-                # Get log content from first file
-                log_content = ""
-                if state.get("log_files"):
-                    log_content = state["log_files"][0].get("content", "")[:5000]
-                
-                # Send notifications
-                notification_results = self.notification_agent.send_notifications(
-                    error_type=error_type,
-                    severity=severity,
-                    causes=causes,
-                    selected_solution=selected_solution,
-                    log_content=log_content,
-                    aggregated_data=classification_result
-                )
-                
-                state["notification_results"] = notification_results
-                state["current_step"] = "notifications_sent"
-            else:
-                state["errors"].append("No errors to notify about")
-                state["current_step"] = "notification_skipped"
+                    'title': error_type,
+                    'description': f"Error occurred {error_details.get('count', 0)} times"
+                }]
+            
+            # Send notifications
+            notification_results = await self.notification_agent.asend_notifications(
+                error_type=error_type,
+                severity=severity,
+                causes=causes,
+                selected_solution=selected_solution,
+                log_content=state["content_head"],
+                aggregated_data=classification_result
+            )
+            
+            return {"notification_results": notification_results, "current_step": "notifications_sent"}
         
         except Exception as e:
-            state["errors"].append(f"Notification error: {str(e)}")
-            state["current_step"] = "notification_failed"
-        
-        return state
+            return {"current_step": "notification_failed", "errors": [f"Notification error: {str(e)}"]}
+    
+    def _initial_state(
+        self,
+        log_files: List[Dict[str, str]],
+        selected_solution: Optional[Dict[str, Any]] = None
+    ) -> AgentState:
+        """Fresh workflow state for log_files, built from _EMPTY_STATE"""
+        return {
+            **_EMPTY_STATE,
+            "log_files": log_files,
+            "content_head": self._content_head(log_files),
+            "api_key": self.api_key,
+            "selected_solution": selected_solution,
+            "errors": []  # New list per run; never alias the template's
+        }
     
     def run_workflow(
         self,
@@ -197,55 +295,54 @@ class MultiAgentOrchestrator:
         send_notifications: bool = False
     ) -> Dict[str, Any]:
         """Run the complete multi-agent workflow"""
-        initial_state: AgentState = {
-            "log_files": log_files,
-            "api_key": self.api_key,
-            "classification_result": None,
-            "aggregated_errors": None,
-            "solutions": None,
-            "selected_solution": selected_solution,
-            "notification_results": None,
-            "current_step": "initialized",
-            "errors": []
-        }
+        return _run_sync(self.arun_workflow(log_files, selected_solution, send_notifications))
+    
+    async def arun_workflow(
+        self,
+        log_files: List[Dict[str, str]],
+        selected_solution: Optional[Dict[str, Any]] = None,
+        send_notifications: bool = False
+    ) -> Dict[str, Any]:
+        """Async variant of run_workflow"""
+        initial_state = self._initial_state(log_files, selected_solution)
         
-        # Run the workflow
-        final_state = self.workflow.invoke(initial_state)
+        if not send_notifications and selected_solution is None:
+            # Fast path for plain analysis: nothing to notify about, so call the
+            # two nodes directly and skip the graph engine's per-step overhead
+            final_state = self._merge(initial_state, await self.classify_errors_node(initial_state))
+            final_state = self._merge(final_state, await self.find_solutions_node(final_state))
+        else:
+            # Run the workflow
+            final_state = await self.workflow.ainvoke(initial_state)
         
         return {
-            "classification_result": final_state.get("classification_result"),
-            "aggregated_errors": final_state.get("aggregated_errors"),
-            "solutions": final_state.get("solutions"),
-            "selected_solution": final_state.get("selected_solution"),
-            "notification_results": final_state.get("notification_results") if send_notifications else None,
-            "current_step": final_state.get("current_step"),
-            "errors": final_state.get("errors", []),
-            "success": len(final_state.get("errors", [])) == 0
+            "classification_result": final_state["classification_result"],
+            "aggregated_errors": final_state["aggregated_errors"],
+            "solutions": final_state["solutions"],
+            "selected_solution": final_state["selected_solution"],
+            "notification_results": final_state["notification_results"] if send_notifications else None,
+            "current_step": final_state["current_step"],
+            "errors": final_state["errors"],
+            "success": len(final_state["errors"]) == 0
         }
     
     def run_classification_only(self, log_files: List[Dict[str, str]]) -> Dict[str, Any]:
         """Run only the classification agent"""
-        initial_state: AgentState = {
-            "log_files": log_files,
-            "api_key": self.api_key,
-            "classification_result": None,
-            "aggregated_errors": None,
-            "solutions": None,
-            "selected_solution": None,
-            "notification_results": None,
-            "current_step": "initialized",
-            "errors": []
-        }
+        return _run_sync(self.arun_classification_only(log_files))
+    
+    async def arun_classification_only(self, log_files: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Async variant of run_classification_only"""
+        initial_state = self._initial_state(log_files)
         
         # Run only classification
-        state = self.classify_errors_node(initial_state)
+        state = self._merge(initial_state, await self.classify_errors_node(initial_state))
         
         return {
-            "classification_result": state.get("classification_result"),
-            "aggregated_errors": state.get("aggregated_errors"),
-            "current_step": state.get("current_step"),
-            "errors": state.get("errors", []),
-            "success": len(state.get("errors", [])) == 0
+            "classification_result": state["classification_result"],
+            "aggregated_errors": state["aggregated_errors"],
+            "current_step": state["current_step"],
+            "errors": state["errors"],
+            "success": len(state["errors"]) == 0
         }
     
     def run_with_selected_solution(
@@ -255,32 +352,78 @@ class MultiAgentOrchestrator:
         send_notifications: bool = True
     ) -> Dict[str, Any]:
         """Run workflow with a pre-selected solution"""
-        initial_state: AgentState = {
-            "log_files": log_files,
-            "api_key": self.api_key,
-            "classification_result": None,
-            "aggregated_errors": None,
-            "solutions": None,
-            "selected_solution": selected_solution,
-            "notification_results": None,
-            "current_step": "initialized",
-            "errors": []
-        }
+        return _run_sync(self.arun_with_selected_solution(log_files, selected_solution, send_notifications))
+    
+    async def arun_with_selected_solution(
+        self,
+        log_files: List[Dict[str, str]],
+        selected_solution: Dict[str, Any],
+        send_notifications: bool = True
+    ) -> Dict[str, Any]:
+        """Async variant of run_with_selected_solution"""
+        initial_state = self._initial_state(log_files, selected_solution)
         
         # Run classification
-        state = self.classify_errors_node(initial_state)
+        state = self._merge(initial_state, await self.classify_errors_node(initial_state))
         
         # Skip solution finding, go directly to notifications if requested
         if send_notifications:
-            state = self.send_notifications_node(state)
+            state = self._merge(state, await self.send_notifications_node(state))
         
         return {
-            "classification_result": state.get("classification_result"),
-            "aggregated_errors": state.get("aggregated_errors"),
-            "selected_solution": state.get("selected_solution"),
-            "notification_results": state.get("notification_results"),
-            "current_step": state.get("current_step"),
-            "errors": state.get("errors", []),
-            "success": len(state.get("errors", [])) == 0
+            "classification_result": state["classification_result"],
+            "aggregated_errors": state["aggregated_errors"],
+            "selected_solution": state["selected_solution"],
+            "notification_results": state["notification_results"],
+            "current_step": state["current_step"],
+            "errors": state["errors"],
+            "success": len(state["errors"]) == 0
         }
 
+
+_orchestrators: "OrderedDict[str, MultiAgentOrchestrator]" = OrderedDict()
+_orchestrators_lock = threading.Lock()
+
+
+def _close_http_clients(http_client, http_async_client) -> None:
+    """Close an orchestrator's connection pools without waiting on the event loop"""
+    http_client.close()
+    asyncio.run_coroutine_threadsafe(http_async_client.aclose(), _background_loop())
+
+
+def get_orchestrator(api_key: str, slack_webhook: Optional[str] = None, jira_config: Optional[Dict] = None) -> MultiAgentOrchestrator:
+    """Shared orchestrator for this configuration, built on first use.
+
+    Reuses the agents, HTTP connection pools and compiled graph across
+    requests instead of rebuilding them for every dashboard action. Entries
+    are keyed by a digest so no credentials are held as cache keys, and the
+    least recently used one is dropped once more than MAX_CACHED_ORCHESTRATORS
+    configurations are live. A dropped orchestrator may still be running a
+    workflow, so its HTTP clients are closed only once it is garbage collected.
+    """
+    key = hashlib.blake2b(
+        orjson.dumps([api_key, slack_webhook, jira_config], default=str, option=orjson.OPT_SORT_KEYS),
+        digest_size=16,
+    ).hexdigest()
+    with _orchestrators_lock:
+        orchestrator = _orchestrators.get(key)
+        if orchestrator is not None:
+            _orchestrators.move_to_end(key)
+            return orchestrator
+    
+    # Built outside the lock: the first build imports langgraph and compiles
+    # the graph, and other configurations' lookups shouldn't wait on it
+    built = MultiAgentOrchestrator(api_key, slack_webhook, jira_config)
+    finalizer = weakref.finalize(built, _close_http_clients, built.http_client, built.http_async_client)
+    finalizer.atexit = False
+    with _orchestrators_lock:
+        orchestrator = _orchestrators.get(key)
+        if orchestrator is None:
+            # Evicted entries are only unreferenced here; see the docstring
+            orchestrator = _orchestrators[key] = built
+            while len(_orchestrators) > MAX_CACHED_ORCHESTRATORS:
+                _orchestrators.popitem(last=False)
+        else:
+            # Another thread built this configuration first; ours is discarded
+            _orchestrators.move_to_end(key)
+    return orchestrator
@@ -3,56 +3,61 @@ Agent 1: Error Classification Agent
 Processes multiple log files, classifies errors, aggregates issues, and provides analysis
 """
 from typing import Dict, List, Any, Optional
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
+import asyncio
+import heapq
 import json
-import re
+import orjson
 from datetime import datetime
 
+from log_scan import extract_error_lines, keyword_pattern
+
+# Cap on concurrent OpenRouter calls when classifying a batch of log files
+MAX_CONCURRENT_CLASSIFICATIONS = 8
+
+# Any of these (case-insensitive) marks a line as an error line. Matched as one
+# compiled alternation against the lowercased log rather than per line and keyword.
+_ERROR_KEYWORDS = (
+    'error', 'exception', 'failed', 'failure', 'fatal',
+    'traceback', 'stack trace', 'err', 'critical',
+    'panic', 'abort', 'timeout', 'denied', 'forbidden',
+    'warning', 'warn', 'alert'
+)
+_ERROR_KEYWORD_RE = keyword_pattern(_ERROR_KEYWORDS)
+
+# Most recent error lines kept per file
+MAX_ERROR_LINES = 100
+
 
 class ErrorClassificationAgent:
     """Agent responsible for error classification and aggregation"""
     
-    def __init__(self, api_key: str, model: str = "openai/gpt-4o-mini"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "openai/gpt-4o-mini",
+        http_client: Optional[Any] = None,
+        http_async_client: Optional[Any] = None
+    ):
+        # Deferred: langchain_openai is a heavy import
+        from langchain_openai import ChatOpenAI
+        
         self.llm = ChatOpenAI(
             api_key=api_key,
             model=model,
             base_url="https://openrouter.ai/api/v1",
+            http_client=http_client,  # Optional shared httpx pools
+            http_async_client=http_async_client,
             temperature=0.3
         )
         self.model = model
     
     def extract_error_lines(self, log_content: str) -> List[str]:
-        """Extract lines that likely contain errors"""
-        error_keywords = [
-            'error', 'exception', 'failed', 'failure', 'fatal',
-            'traceback', 'stack trace', 'err', 'critical',
-            'panic', 'abort', 'timeout', 'denied', 'forbidden',
-            'warning', 'warn', 'alert'
-        ]
-        
-        lines = log_content.split('\n')
-        error_lines = []
-        
-        for line in lines:
-            line_lower = line.lower()
-            if any(keyword in line_lower for keyword in error_keywords):
-                error_lines.append(line)
-        
-        return error_lines[-100:] if len(error_lines) > 100 else error_lines
+        """Extract the last MAX_ERROR_LINES lines that likely contain errors"""
+        return extract_error_lines(log_content, _ERROR_KEYWORD_RE, MAX_ERROR_LINES)
     
-    def classify_single_log(self, log_content: str, filename: str = "unknown") -> Dict[str, Any]:
-        """Classify errors in a single log file"""
-        error_lines = self.extract_error_lines(log_content)
-        
-        if not error_lines:
-            return {
-                'filename': filename,
-                'error_count': 0,
-                'errors': [],
-                'status': 'no_errors'
-            }
-        
+    def _classification_messages(self, error_lines: List[str], filename: str) -> List:
+        """Build the LLM messages for classifying a single log file"""
         # Prepare context for LLM
         error_context = '\n'.join(error_lines[-30:])  # Last 30 error lines
         
@@ -81,57 +86,124 @@ Provide a JSON response with this structure:
 
 Return ONLY valid JSON."""
 
-        try:
-            messages = [
-                SystemMessage(content="You are an expert log analyst. Always respond with valid JSON only."),
-                HumanMessage(content=prompt)
-            ]
-            
-            response = self.llm.invoke(messages)
-            result_text = response.content.strip()
-            
-            # Clean JSON if wrapped in markdown
-            if result_text.startswith("```json"):
-                result_text = result_text.replace("```json", "").replace("```", "").strip()
-            elif result_text.startswith("```"):
-                result_text = result_text.replace("```", "").strip()
-            
-            result = json.loads(result_text)
-            result['filename'] = filename
-            result['status'] = 'analyzed'
-            
-            return result
-            
-        except json.JSONDecodeError as e:
+        return [
+            SystemMessage(content="You are an expert log analyst. Always respond with valid JSON only."),
+            HumanMessage(content=prompt)
+        ]
+    
+    def _parse_classification(self, response_content: str, filename: str) -> Dict[str, Any]:
+        """Parse the LLM classification response for a single log file"""
+        result_text = response_content.strip()
+        
+        # Clean JSON if wrapped in markdown
+        if result_text.startswith("```json"):
+            result_text = result_text.replace("```json", "").replace("```", "").strip()
+        elif result_text.startswith("```"):
+            result_text = result_text.replace("```", "").strip()
+        
+        result = orjson.loads(result_text)
+        result['filename'] = filename
+        result['status'] = 'analyzed'
+        
+        return result
+    
+    def _classification_failure(self, error: Exception, filename: str, error_lines: List[str]) -> Dict[str, Any]:
+        """Build the fallback result when classification of a log file fails"""
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        if isinstance(error, json.JSONDecodeError):
             return {
                 'filename': filename,
                 'error_count': len(error_lines),
-                'errors': [{'error_type': 'Parse Error', 'severity': 'Medium', 'message': str(e)}],
+                'errors': [{'error_type': 'Parse Error', 'severity': 'Medium', 'message': str(error)}],
                 'status': 'parse_error'
             }
+        return {
+            'filename': filename,
+            'error_count': len(error_lines),
+            'errors': [{'error_type': 'Analysis Error', 'severity': 'High', 'message': str(error)}],
+            'status': 'error'
+        }
+    
+    def classify_single_log(self, log_content: str, filename: str = "unknown") -> Dict[str, Any]:
+        """Classify errors in a single log file"""
+        error_lines = self.extract_error_lines(log_content)
+        
+        if not error_lines:
+            return {
+                'filename': filename,
+                'error_count': 0,
+                'errors': [],
+                'status': 'no_errors'
+            }
+        
+        try:
+            response = self.llm.invoke(self._classification_messages(error_lines, filename))
+            return self._parse_classification(response.content, filename)
         except Exception as e:
+            return self._classification_failure(e, filename, error_lines)
+    
+    async def aclassify_single_log(self, log_content: str, filename: str = "unknown") -> Dict[str, Any]:
+        """Async variant of classify_single_log"""
+        # The scan is CPU-bound over the whole log; off the shared event loop it
+        # doesn't stall other files' (and sessions') in-flight LLM calls
+        error_lines = await asyncio.to_thread(self.extract_error_lines, log_content)
+        
+        if not error_lines:
             return {
                 'filename': filename,
-                'error_count': len(error_lines),
-                'errors': [{'error_type': 'Analysis Error', 'severity': 'High', 'message': str(e)}],
-                'status': 'error'
+                'error_count': 0,
+                'errors': [],
+                'status': 'no_errors'
             }
+        
+        try:
+            response = await self.llm.ainvoke(self._classification_messages(error_lines, filename))
+            return self._parse_classification(response.content, filename)
+        except Exception as e:
+            return self._classification_failure(e, filename, error_lines)
     
     def process_multiple_logs(self, log_files: List[Dict[str, str]]) -> Dict[str, Any]:
         """Process multiple log files and aggregate results"""
-        all_results = []
-        total_errors = 0
+        all_results = [
+            self.classify_single_log(log_file.get('content', ''), log_file.get('filename', 'unknown'))
+            for log_file in log_files
+        ]
+        
+        error_types, severity_counts = self._aggregate_errors(all_results)
+        
+        # Aggregate analysis
+        aggregated_analysis = self._aggregate_analysis(all_results, error_types, severity_counts)
+        
+        return self._build_result(log_files, all_results, error_types, severity_counts, aggregated_analysis)
+    
+    async def aprocess_multiple_logs(self, log_files: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Process multiple log files concurrently and aggregate results"""
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CLASSIFICATIONS)
+        
+        async def classify_one(log_file: Dict[str, str]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.aclassify_single_log(
+                    log_file.get('content', ''),
+                    log_file.get('filename', 'unknown')
+                )
+        
+        # gather preserves input order, so file_results line up with log_files
+        all_results = list(await asyncio.gather(*[classify_one(f) for f in log_files]))
+        
+        error_types, severity_counts = self._aggregate_errors(all_results)
+        
+        # Aggregate analysis
+        aggregated_analysis = await self._aaggregate_analysis(all_results, error_types, severity_counts)
+        
+        return self._build_result(log_files, all_results, error_types, severity_counts, aggregated_analysis)
+    
+    def _aggregate_errors(self, all_results: List[Dict]) -> tuple:
+        """Aggregate error types and severity counts across per-file results"""
         error_types = {}
         severity_counts = {'Critical': 0, 'High': 0, 'Medium': 0, 'Low': 0}
         
-        for log_file in log_files:
-            filename = log_file.get('filename', 'unknown')
-            content = log_file.get('content', '')
-            
-            result = self.classify_single_log(content, filename)
-            all_results.append(result)
-            
-            total_errors += result.get('error_count', 0)
+        for result in all_results:
+            filename = result.get('filename', 'unknown')
             
             # Aggregate error types
             for error in result.get('errors', []):
@@ -151,16 +223,25 @@ Return ONLY valid JSON."""
                 if severity in severity_counts:
                     severity_counts[severity] += 1
         
-        # Convert sets to lists for JSON serialization
-        for error_type in error_types:
-            error_types[error_type]['files'] = list(error_types[error_type]['files'])
-        
-        # Aggregate analysis
-        aggregated_analysis = self._aggregate_analysis(all_results, error_types, severity_counts)
+        # Convert sets to sorted lists for JSON serialization (sorted once here, so
+        # consumers that need a stable order don't re-sort)
+        for details in error_types.values():
+            details['files'] = sorted(details['files'])
         
+        return error_types, severity_counts
+    
+    def _build_result(
+        self,
+        log_files: List[Dict[str, str]],
+        all_results: List[Dict],
+        error_types: Dict,
+        severity_counts: Dict,
+        aggregated_analysis: Dict
+    ) -> Dict[str, Any]:
+        """Assemble the aggregated classification result"""
         return {
             'files_processed': len(log_files),
-            'total_errors': total_errors,
+            'total_errors': sum(r.get('error_count', 0) for r in all_results),
             'file_results': all_results,
             'aggregated_errors': error_types,
             'severity_distribution': severity_counts,
@@ -168,19 +249,20 @@ Return ONLY valid JSON."""
             'timestamp': datetime.now().isoformat()
         }
     
-    def _aggregate_analysis(self, results: List[Dict], error_types: Dict, severity_counts: Dict) -> Dict[str, Any]:
-        """Create aggregated analysis using LLM"""
+    def _aggregate_analysis_messages(self, results: List[Dict], error_types: Dict, severity_counts: Dict) -> List:
+        """Build the LLM messages for the aggregated analysis"""
         summary_data = {
             'total_files': len(results),
             'total_errors': sum(r.get('error_count', 0) for r in results),
             'error_types': list(error_types.keys()),
             'severity_breakdown': severity_counts,
-            'top_errors': sorted(error_types.items(), key=lambda x: x[1]['count'], reverse=True)[:5]
+            # Partial selection: only the top 5 are needed, not a full sort
+            'top_errors': heapq.nlargest(5, error_types.items(), key=lambda x: x[1]['count'])
         }
         
         prompt = f"""Based on the following aggregated error data, provide a comprehensive analysis:
 
-{json.dumps(summary_data, indent=2)}
+{orjson.dumps(summary_data, default=str).decode()}
 
 Provide a JSON response with:
 {{
@@ -193,28 +275,46 @@ Provide a JSON response with:
 
 Return ONLY valid JSON."""
 
+        return [
+            SystemMessage(content="You are an expert DevOps analyst. Always respond with valid JSON only."),
+            HumanMessage(content=prompt)
+        ]
+    
+    def _parse_aggregate_analysis(self, response_content: str) -> Dict[str, Any]:
+        """Parse the LLM aggregated analysis response"""
+        result_text = response_content.strip()
+        
+        if result_text.startswith("```json"):
+            result_text = result_text.replace("```json", "").replace("```", "").strip()
+        elif result_text.startswith("```"):
+            result_text = result_text.replace("```", "").strip()
+        
+        return orjson.loads(result_text)
+    
+    def _aggregate_analysis_failure(self, error: Exception) -> Dict[str, Any]:
+        """Fallback aggregated analysis when the LLM call fails"""
+        return {
+            'overall_severity': 'Medium',
+            'primary_issue_category': 'General',
+            'key_findings': ['Analysis completed with errors'],
+            'recommended_actions': ['Review logs manually'],
+            'risk_assessment': f'Analysis error: {str(error)}'
+        }
+    
+    def _aggregate_analysis(self, results: List[Dict], error_types: Dict, severity_counts: Dict) -> Dict[str, Any]:
+        """Create aggregated analysis using LLM"""
         try:
-            messages = [
-                SystemMessage(content="You are an expert DevOps analyst. Always respond with valid JSON only."),
-                HumanMessage(content=prompt)
-            ]
-            
+            messages = self._aggregate_analysis_messages(results, error_types, severity_counts)
             response = self.llm.invoke(messages)
-            result_text = response.content.strip()
-            
-            if result_text.startswith("```json"):
-                result_text = result_text.replace("```json", "").replace("```", "").strip()
-            elif result_text.startswith("```"):
-                result_text = result_text.replace("```", "").strip()
-            
-            return json.loads(result_text)
-            
+            return self._parse_aggregate_analysis(response.content)
         except Exception as e:
-            return {
-                'overall_severity': 'Medium',
-                'primary_issue_category': 'General',
-                'key_findings': ['Analysis completed with errors'],
-                'recommended_actions': ['Review logs manually'],
-                'risk_assessment': f'Analysis error: {str(e)}'
-            }
-
+            return self._aggregate_analysis_failure(e)
+    
+    async def _aaggregate_analysis(self, results: List[Dict], error_types: Dict, severity_counts: Dict) -> Dict[str, Any]:
+        """Async variant of _aggregate_analysis"""
+        try:
+            messages = self._aggregate_analysis_messages(results, error_types, severity_counts)
+            response = await self.llm.ainvoke(messages)
+            return self._parse_aggregate_analysis(response.content)
+        except Exception as e:
+            return self._aggregate_analysis_failure(e)
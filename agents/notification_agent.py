@@ -3,19 +3,18 @@ Agent 3: Notification Agent
 Handles notifications to JIRA and Slack using existing notification_agents.py
 """
 from typing import Dict, List, Any, Optional
+import asyncio
+import importlib.util
 import sys
 import os
+import threading
 
 # Add parent directory to path to import notification_agents
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-try:
-    from notification_agents import SlackNotifier, JIRANotifier
-    JIRA_AVAILABLE = True
-except ImportError:
-    JIRA_AVAILABLE = False
-    JIRANotifier = None
-    SlackNotifier = None
+# notification_agents (and the jira client) are imported when a notifier is
+# first needed, so analysis-only runs never load them
+JIRA_AVAILABLE = importlib.util.find_spec("jira") is not None
 
 
 class NotificationAgent:
@@ -24,27 +23,48 @@ class NotificationAgent:
     def __init__(self, slack_webhook: Optional[str] = None, jira_config: Optional[Dict] = None):
         self.slack_webhook = slack_webhook
         self.jira_config = jira_config or {}
-        self.slack_notifier = None
-        self.jira_notifier = None
-        
-        # Initialize Slack notifier if webhook provided
-        if slack_webhook and SlackNotifier:
-            try:
-                self.slack_notifier = SlackNotifier(slack_webhook)
-            except Exception as e:
-                print(f"Failed to initialize Slack notifier: {str(e)}")
-        
-        # Initialize JIRA notifier if config provided
-        if jira_config and JIRA_AVAILABLE and JIRANotifier:
-            try:
-                if all(k in jira_config for k in ['server', 'email', 'api_token']):
-                    self.jira_notifier = JIRANotifier(
+        # Notifiers are built on first use; only successful builds are kept,
+        # so a transient failure is retried on the next send
+        self._slack_notifier = None
+        self._jira_notifier = None
+        # One lock each so a slow JIRA login doesn't hold up the Slack notifier
+        self._slack_lock = threading.Lock()
+        self._jira_lock = threading.Lock()
+    
+    @property
+    def slack_notifier(self):
+        """Slack notifier, built on first use if a webhook was provided"""
+        if self._slack_notifier is not None or not self.slack_webhook:
+            return self._slack_notifier
+        with self._slack_lock:
+            if self._slack_notifier is None:
+                try:
+                    from notification_agents import SlackNotifier
+                    self._slack_notifier = SlackNotifier(self.slack_webhook)
+                except Exception as e:
+                    print(f"Failed to initialize Slack notifier: {str(e)}")
+            return self._slack_notifier
+    
+    @property
+    def jira_notifier(self):
+        """JIRA notifier, built (and logged in) on first use rather than with the agent"""
+        jira_config = self.jira_config
+        if self._jira_notifier is not None or not (
+            JIRA_AVAILABLE and all(k in jira_config for k in ['server', 'email', 'api_token'])
+        ):
+            return self._jira_notifier
+        with self._jira_lock:
+            if self._jira_notifier is None:
+                try:
+                    from notification_agents import JIRANotifier
+                    self._jira_notifier = JIRANotifier(
                         server=jira_config['server'],
                         email=jira_config['email'],
                         api_token=jira_config['api_token']
                     )
-            except Exception as e:
-                print(f"Failed to initialize JIRA notifier: {str(e)}")
+                except Exception as e:
+                    print(f"Failed to initialize JIRA notifier: {str(e)}")
+            return self._jira_notifier
     
     def send_slack_notification(
         self,
@@ -55,14 +75,15 @@ class NotificationAgent:
         aggregated_data: Optional[Dict] = None
     ) -> Dict[str, Any]:
         """Send notification to Slack"""
-        if not self.slack_notifier:
+        slack_notifier = self.slack_notifier
+        if not slack_notifier:
             return {
                 'success': False,
                 'error': 'Slack notifier not initialized. Provide SLACK_WEBHOOK_URL.'
             }
         
         try:
-            success = self.slack_notifier.send_error_notification(
+            success = slack_notifier.send_error_notification(
                 error_type=error_type,
                 severity=severity,
                 causes=causes,
@@ -91,7 +112,8 @@ class NotificationAgent:
         aggregated_data: Optional[Dict] = None
     ) -> Dict[str, Any]:
         """Create JIRA ticket"""
-        if not self.jira_notifier:
+        jira_notifier = self.jira_notifier
+        if not jira_notifier:
             return {
                 'success': False,
                 'error': 'JIRA notifier not initialized. Provide JIRA configuration.'
@@ -107,7 +129,7 @@ class NotificationAgent:
         try:
             issue_type = self.jira_config.get('issue_type', 'Task')
             
-            ticket = self.jira_notifier.create_error_ticket(
+            ticket = jira_notifier.create_error_ticket(
                 project_key=project_key,
                 error_type=error_type,
                 severity=severity,
@@ -175,10 +197,63 @@ class NotificationAgent:
                 aggregated_data=aggregated_data
             )
         
-        results['all_success'] = (
+        results['all_success'] = self._all_success(results, send_slack, send_jira)
+        
+        return results
+    
+    async def asend_notifications(
+        self,
+        error_type: str,
+        severity: str,
+        causes: List[Dict],
+        selected_solution: Dict,
+        log_content: str = "",
+        aggregated_data: Optional[Dict] = None,
+        send_slack: bool = True,
+        send_jira: bool = True
+    ) -> Dict[str, Any]:
+        """Send notifications to Slack and JIRA concurrently"""
+        results = {
+            'slack': None,
+            'jira': None,
+            'all_success': False
+        }
+        
+        # The Slack and JIRA clients are blocking, so fan them out on worker threads
+        tasks = {}
+        if send_slack:
+            tasks['slack'] = asyncio.to_thread(
+                self.send_slack_notification,
+                error_type=error_type,
+                severity=severity,
+                causes=causes,
+                selected_solution=selected_solution,
+                aggregated_data=aggregated_data
+            )
+        
+        if send_jira:
+            tasks['jira'] = asyncio.to_thread(
+                self.create_jira_ticket,
+                error_type=error_type,
+                severity=severity,
+                causes=causes,
+                selected_solution=selected_solution,
+                log_content=log_content,
+                aggregated_data=aggregated_data
+            )
+        
+        for platform, result in zip(tasks, await asyncio.gather(*tasks.values())):
+            results[platform] = result
+        
+        results['all_success'] = self._all_success(results, send_slack, send_jira)
+        
+        return results
+    
+    @staticmethod
+    def _all_success(results: Dict[str, Any], send_slack: bool, send_jira: bool) -> bool:
+        """Whether every requested notification succeeded"""
+        return bool(
             (not send_slack or results['slack'] and results['slack'].get('success', False)) and
             (not send_jira or results['jira'] and results['jira'].get('success', False))
         )
-        
-        return results
 
@@ -2,206 +2,363 @@
 Agent 2: Solution Finding Agent
 Finds possible solutions for identified errors and provides top 3 options
 """
-from typing import Dict, List, Any, Optional
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-import json
+from typing import Dict, List, Any, Optional, Literal, Tuple
+from collections import OrderedDict
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.exceptions import OutputParserException
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from tenacity import AsyncRetrying, Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential
+from dataclasses import dataclass, asdict, replace
+import hashlib
+import openai
+import orjson
+
+# Number of distinct errors whose solutions are kept in memory
+SOLUTION_CACHE_SIZE = 512
+
+# Transient OpenRouter failures retried with exponential backoff (2s, 4s, ... capped at 10s)
+_TRANSIENT_LLM_ERRORS = (
+    openai.APIConnectionError,  # Includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+_LLM_RETRY_POLICY = dict(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=2, min=2, max=10),
+    retry=retry_if_exception_type(_TRANSIENT_LLM_ERRORS),
+    reraise=True
+)
+
+# error_details fields that differ between otherwise identical errors
+_NOISY_DETAIL_FIELDS = frozenset({'timestamp', 'trace_id', 'line_number'})
+
+
+@dataclass(frozen=True, slots=True)
+class Solution:
+    """A single remediation option
+    
+    Frozen so cached and fallback solutions can be shared without copying;
+    use to_dict() where plain dicts are needed (workflow state, UI, JSON).
+    """
+    rank: int
+    title: str
+    description: str
+    effectiveness: str
+    complexity: str
+    time_estimate: str
+    steps: Tuple[str, ...]
+    code_example: str = ""
+    prerequisites: Tuple[str, ...] = ()
+    risk_level: str = "Medium"
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Solution":
+        """Build a Solution from a dict such as SolutionSchema.model_dump()"""
+        return cls(**{
+            **data,
+            'steps': tuple(data.get('steps', ())),
+            'prerequisites': tuple(data.get('prerequisites', ()))
+        })
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict with list fields, matching the LLM schema"""
+        data = asdict(self)
+        data['steps'] = list(self.steps)
+        data['prerequisites'] = list(self.prerequisites)
+        return data
+
+
+# Returned when the LLM response does not match the schema. Solutions are
+# immutable, so every failure can hand out the same objects.
+_PARSE_FALLBACK_SOLUTIONS = (
+    Solution(
+        rank=1,
+        title='Retry Analysis',
+        description='Try analyzing the error again with more context',
+        effectiveness='Medium',
+        complexity='Low',
+        time_estimate='5 minutes',
+        steps=('Click Analyze Errors again', 'Check API key', 'Verify log file format'),
+        code_example='',
+        prerequisites=(),
+        risk_level='Low'
+    ),
+    Solution(
+        rank=2,
+        title='Manual Review',
+        description='Review the log file manually for errors',
+        effectiveness='High',
+        complexity='Medium',
+        time_estimate='30 minutes',
+        steps=('Open log file', 'Search for error keywords', 'Review stack traces'),
+        code_example='',
+        prerequisites=(),
+        risk_level='Low'
+    ),
+    Solution(
+        rank=3,
+        title='Contact Support',
+        description='If issue persists, contact support team',
+        effectiveness='High',
+        complexity='Low',
+        time_estimate='1 hour',
+        steps=('Document the error', 'Check logs', 'Contact administrator'),
+        code_example='',
+        prerequisites=(),
+        risk_level='Low'
+    ),
+)
+
+# Generic fallback; the description is filled in with the error per call (via replace())
+_ERROR_FALLBACK_SOLUTION = Solution(
+    rank=1,
+    title='Error in Solution Generation',
+    description='',
+    effectiveness='Low',
+    complexity='Low',
+    time_estimate='Unknown',
+    steps=('Check error message', 'Retry operation'),
+    code_example='',
+    prerequisites=(),
+    risk_level='Low'
+)
+
+# Scores used by rank_solutions (higher is better)
+_EFFECTIVENESS_SCORES = {'High': 3, 'Medium': 2, 'Low': 1}
+_COMPLEXITY_SCORES = {'Low': 3, 'Medium': 2, 'High': 1}
+
+# Built once at import; per call only the error context is formatted in
+_SOLUTION_PROMPT = ChatPromptTemplate.from_messages([
+    SystemMessage(content="You are an expert software engineer and DevOps specialist who provides actionable solutions."),
+    ("human", """Based on the following error information, provide exactly 3 solutions ranked by effectiveness and practicality.
+
+{error_context}
+
+Requirements:
+- Provide exactly 3 solutions
+- Rank them by effectiveness (rank 1 = best)
+- Solutions should be practical and actionable
+- Include code examples if applicable
+- Be specific and technical
+- Focus on root causes, not just symptoms""")
+])
+
+
+class SolutionSchema(BaseModel):
+    """A single remediation option, as returned by the LLM"""
+    model_config = ConfigDict(frozen=True)
+    
+    rank: int = Field(description="1 = best")
+    title: str = Field(description="Solution title (be specific and actionable)")
+    description: str = Field(description="What this solution does and why it works")
+    effectiveness: Literal["High", "Medium", "Low"]
+    complexity: Literal["Low", "Medium", "High"]
+    time_estimate: str = Field(description="Brief time estimate (e.g., '5 minutes', '1 hour', '1 day')")
+    steps: List[str] = Field(description="Specific, ordered implementation steps")
+    code_example: str = Field(default="", description="Code example if applicable, otherwise empty string")
+    prerequisites: List[str] = Field(default_factory=list)
+    risk_level: Literal["Low", "Medium", "High"]
+
+
+class SolutionList(BaseModel):
+    """Structured-output schema for find_solutions"""
+    solutions: List[SolutionSchema]
 
 
 class SolutionAgent:
     """Agent responsible for finding and ranking solutions"""
     
-    def __init__(self, api_key: str, model: str = "openai/gpt-4o-mini"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "openai/gpt-4o-mini",
+        cache_size: int = SOLUTION_CACHE_SIZE,
+        http_client: Optional[Any] = None,
+        http_async_client: Optional[Any] = None
+    ):
+        # Deferred: langchain_openai is a heavy import
+        from langchain_openai import ChatOpenAI
+        
         self.llm = ChatOpenAI(
             api_key=api_key,
             model=model,
             base_url="https://openrouter.ai/api/v1",
+            http_client=http_client,  # Optional shared httpx pools
+            http_async_client=http_async_client,
+            max_retries=0,  # Retries are handled by _invoke_llm/_ainvoke_llm
             temperature=0.4  # Slightly higher for creative solutions
         )
+        # Schema is enforced server-side, so the prompt carries no JSON example
+        self.structured_llm = self.llm.with_structured_output(SolutionList, method="json_schema")
         self.model = model
+        self.cache_size = cache_size
+        self._solution_cache: "OrderedDict[str, Tuple[Solution, ...]]" = OrderedDict()
     
-    def find_solutions(
+    def _cache_key(
         self,
         error_type: str,
         severity: str,
         error_details: Dict[str, Any],
         aggregated_analysis: Optional[Dict] = None
-    ) -> List[Dict[str, Any]]:
-        """Find top 3 solutions for the given error"""
+    ) -> str:
+        """Hash the error so semantically equivalent errors share a cache entry"""
+        details = {k: v for k, v in (error_details or {}).items() if k not in _NOISY_DETAIL_FIELDS}
+        if isinstance(details.get('files'), list):
+            details['files'] = sorted(details['files'])
         
-        # Build context from error details
+        payload = orjson.dumps({
+            'error_type': error_type,
+            'severity': severity,
+            'error_details': details,
+            'aggregated_analysis': aggregated_analysis or {}
+        }, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[List[Solution]]:
+        """Return the cached solutions for key, if any"""
+        solutions = self._solution_cache.get(key)
+        if solutions is None:
+            return None
+        self._solution_cache.move_to_end(key)
+        # Solutions are immutable; a fresh list lets callers re-rank freely
+        return list(solutions)
+    
+    def _cache_put(self, key: str, solutions: List[Solution]) -> None:
+        """Store solutions for key, evicting the least recently used entry"""
+        self._solution_cache[key] = tuple(solutions)
+        self._solution_cache.move_to_end(key)
+        while len(self._solution_cache) > self.cache_size:
+            self._solution_cache.popitem(last=False)
+    
+    def clear_cache(self) -> None:
+        """Drop all cached solutions"""
+        self._solution_cache.clear()
+    
+    def _solution_messages(
+        self,
+        error_type: str,
+        severity: str,
+        error_details: Dict[str, Any],
+        aggregated_analysis: Optional[Dict] = None
+    ) -> List:
+        """Build the LLM messages for finding solutions to the given error"""
+        # Build context from error details (compact JSON keeps the prompt short)
         error_context = f"""
 Error Type: {error_type}
 Severity: {severity}
-Error Details: {json.dumps(error_details, indent=2)}
+Error Details: {orjson.dumps(error_details, default=str).decode()}
 """
         
         if aggregated_analysis:
-            error_context += f"\nAggregated Analysis: {json.dumps(aggregated_analysis, indent=2)}"
+            error_context += f"\nAggregated Analysis: {orjson.dumps(aggregated_analysis, default=str).decode()}"
+        
+        return _SOLUTION_PROMPT.format_messages(error_context=error_context)
+    
+    def _normalize_solutions(self, result: SolutionList) -> List[Solution]:
+        """Convert the structured LLM output into exactly 3 solutions"""
+        return self._pad_solutions([Solution.from_dict(solution.model_dump()) for solution in result.solutions[:3]])
+    
+    @staticmethod
+    def _pad_solutions(solutions: List[Solution]) -> List[Solution]:
+        """Append generic alternatives until there are 3 solutions"""
+        while len(solutions) < 3:
+            solutions.append(Solution(
+                rank=len(solutions) + 1,
+                title=f'Alternative Solution {len(solutions) + 1}',
+                description='Review the error context and apply appropriate fixes',
+                effectiveness='Medium',
+                complexity='Medium',
+                time_estimate='Unknown',
+                steps=('Analyze the error', 'Identify root cause', 'Apply fix'),
+                code_example='',
+                prerequisites=(),
+                risk_level='Medium'
+            ))
+        return solutions
+    
+    def _invoke_llm(self, messages: List) -> SolutionList:
+        """Call the structured LLM, retrying transient failures"""
+        for attempt in Retrying(**_LLM_RETRY_POLICY):
+            with attempt:
+                return self.structured_llm.invoke(messages)
+    
+    async def _ainvoke_llm(self, messages: List) -> SolutionList:
+        """Async variant of _invoke_llm"""
+        async for attempt in AsyncRetrying(**_LLM_RETRY_POLICY):
+            with attempt:
+                return await self.structured_llm.ainvoke(messages)
+    
+    def _fallback_solutions(self, error: Exception) -> List[Solution]:
+        """Fallback solutions when the LLM call or response parsing fails"""
+        if isinstance(error, (OutputParserException, ValidationError)):
+            return list(_PARSE_FALLBACK_SOLUTIONS)
+        return [replace(_ERROR_FALLBACK_SOLUTION, description=f'Error occurred: {str(error)}')]
+    
+    def find_solutions(
+        self,
+        error_type: str,
+        severity: str,
+        error_details: Dict[str, Any],
+        aggregated_analysis: Optional[Dict] = None,
+        no_cache: bool = False
+    ) -> List[Solution]:
+        """Find top 3 solutions for the given error, ranked best first"""
+        cache_key = self._cache_key(error_type, severity, error_details, aggregated_analysis)
+        if not no_cache:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
         
-        prompt = f"""Based on the following error information, provide exactly 3 solutions ranked by effectiveness and practicality.
-
-{error_context}
-
-Provide a JSON response with this structure:
-{{
-    "solutions": [
-        {{
-            "rank": 1,
-            "title": "Solution title (be specific and actionable)",
-            "description": "What this solution does and why it works",
-            "effectiveness": "High|Medium|Low",
-            "complexity": "Low|Medium|High",
-            "time_estimate": "Brief time estimate (e.g., '5 minutes', '1 hour', '1 day')",
-            "steps": ["Step 1 (specific action)", "Step 2 (specific action)", "Step 3 (specific action)"],
-            "code_example": "Optional code example if applicable, otherwise empty string",
-            "prerequisites": ["prerequisite1", "prerequisite2"],
-            "risk_level": "Low|Medium|High"
-        }},
-        {{
-            "rank": 2,
-            "title": "Solution 2 title",
-            "description": "What this solution does",
-            "effectiveness": "High|Medium|Low",
-            "complexity": "Low|Medium|High",
-            "time_estimate": "Brief time estimate",
-            "steps": ["Step 1", "Step 2"],
-            "code_example": "",
-            "prerequisites": [],
-            "risk_level": "Low|Medium|High"
-        }},
-        {{
-            "rank": 3,
-            "title": "Solution 3 title",
-            "description": "What this solution does",
-            "effectiveness": "High|Medium|Low",
-            "complexity": "Low|Medium|High",
-            "time_estimate": "Brief time estimate",
-            "steps": ["Step 1", "Step 2", "Step 3"],
-            "code_example": "",
-            "prerequisites": [],
-            "risk_level": "Low|Medium|High"
-        }}
-    ]
-}}
-
-Requirements:
-- Provide exactly 3 solutions
-- Rank them by effectiveness (rank 1 = best)
-- Solutions should be practical and actionable
-- Include code examples if applicable
-- Be specific and technical
-- Focus on root causes, not just symptoms
-
-Return ONLY valid JSON, no additional text."""
-
         try:
-            messages = [
-                SystemMessage(content="You are an expert software engineer and DevOps specialist who provides actionable solutions. Always respond with valid JSON only."),
-                HumanMessage(content=prompt)
-            ]
-            
-            response = self.llm.invoke(messages)
-            result_text = response.content.strip()
-            
-            # Clean JSON if wrapped in markdown
-            if result_text.startswith("```json"):
-                result_text = result_text.replace("```json", "").replace("```", "").strip()
-            elif result_text.startswith("```"):
-                result_text = result_text.replace("```", "").strip()
-            
-            result = json.loads(result_text)
-            solutions = result.get('solutions', [])
-            
-            # Ensure exactly 3 solutions
-            if len(solutions) < 3:
-                while len(solutions) < 3:
-                    solutions.append({
-                        'rank': len(solutions) + 1,
-                        'title': f'Alternative Solution {len(solutions) + 1}',
-                        'description': 'Review the error context and apply appropriate fixes',
-                        'effectiveness': 'Medium',
-                        'complexity': 'Medium',
-                        'time_estimate': 'Unknown',
-                        'steps': ['Analyze the error', 'Identify root cause', 'Apply fix'],
-                        'code_example': '',
-                        'prerequisites': [],
-                        'risk_level': 'Medium'
-                    })
-            elif len(solutions) > 3:
-                solutions = solutions[:3]
-            
-            # Sort by rank
-            solutions.sort(key=lambda x: x.get('rank', 999))
-            
-            return solutions
-            
-        except json.JSONDecodeError as e:
-            # Fallback solutions
-            return [
-                {
-                    'rank': 1,
-                    'title': 'Retry Analysis',
-                    'description': 'Try analyzing the error again with more context',
-                    'effectiveness': 'Medium',
-                    'complexity': 'Low',
-                    'time_estimate': '5 minutes',
-                    'steps': ['Click Analyze Errors again', 'Check API key', 'Verify log file format'],
-                    'code_example': '',
-                    'prerequisites': [],
-                    'risk_level': 'Low'
-                },
-                {
-                    'rank': 2,
-                    'title': 'Manual Review',
-                    'description': 'Review the log file manually for errors',
-                    'effectiveness': 'High',
-                    'complexity': 'Medium',
-                    'time_estimate': '30 minutes',
-                    'steps': ['Open log file', 'Search for error keywords', 'Review stack traces'],
-                    'code_example': '',
-                    'prerequisites': [],
-                    'risk_level': 'Low'
-                },
-                {
-                    'rank': 3,
-                    'title': 'Contact Support',
-                    'description': 'If issue persists, contact support team',
-                    'effectiveness': 'High',
-                    'complexity': 'Low',
-                    'time_estimate': '1 hour',
-                    'steps': ['Document the error', 'Check logs', 'Contact administrator'],
-                    'code_example': '',
-                    'prerequisites': [],
-                    'risk_level': 'Low'
-                }
-            ]
+            messages = self._solution_messages(error_type, severity, error_details, aggregated_analysis)
+            solutions = self.rank_solutions(self._normalize_solutions(self._invoke_llm(messages)))
+        except Exception as e:
+            # Retries are exhausted (or the error is not transient). Fallbacks
+            # are not cached so the next call goes back to the LLM.
+            print(f"Solution generation failed for {error_type!r}: {type(e).__name__}: {e}")
+            return self.rank_solutions(self._fallback_solutions(e))
+        
+        self._cache_put(cache_key, solutions)
+        return solutions
+    
+    async def afind_solutions(
+        self,
+        error_type: str,
+        severity: str,
+        error_details: Dict[str, Any],
+        aggregated_analysis: Optional[Dict] = None,
+        no_cache: bool = False
+    ) -> List[Solution]:
+        """Async variant of find_solutions"""
+        cache_key = self._cache_key(error_type, severity, error_details, aggregated_analysis)
+        if not no_cache:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+        
+        try:
+            messages = self._solution_messages(error_type, severity, error_details, aggregated_analysis)
+            solutions = self.rank_solutions(self._normalize_solutions(await self._ainvoke_llm(messages)))
         except Exception as e:
-            return [
-                {
-                    'rank': 1,
-                    'title': 'Error in Solution Generation',
-                    'description': f'Error occurred: {str(e)}',
-                    'effectiveness': 'Low',
-                    'complexity': 'Low',
-                    'time_estimate': 'Unknown',
-                    'steps': ['Check error message', 'Retry operation'],
-                    'code_example': '',
-                    'prerequisites': [],
-                    'risk_level': 'Low'
-                }
-            ]
-    
-    def rank_solutions(self, solutions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Rank solutions by effectiveness and complexity"""
+            # Retries are exhausted (or the error is not transient). Fallbacks
+            # are not cached so the next call goes back to the LLM.
+            print(f"Solution generation failed for {error_type!r}: {type(e).__name__}: {e}")
+            return self.rank_solutions(self._fallback_solutions(e))
+        
+        self._cache_put(cache_key, solutions)
+        return solutions
+    
+    def rank_solutions(self, solutions: List[Solution]) -> List[Solution]:
+        """Rank solutions by effectiveness and complexity; rank is renumbered to match (1 = best)"""
         def solution_score(sol):
-            effectiveness_map = {'High': 3, 'Medium': 2, 'Low': 1}
-            complexity_map = {'Low': 3, 'Medium': 2, 'High': 1}
-            
-            eff_score = effectiveness_map.get(sol.get('effectiveness', 'Medium'), 2)
-            comp_score = complexity_map.get(sol.get('complexity', 'Medium'), 2)
+            eff_score = _EFFECTIVENESS_SCORES.get(sol.effectiveness, 2)
+            comp_score = _COMPLEXITY_SCORES.get(sol.complexity, 2)
             
             return eff_score * 2 + comp_score  # Effectiveness weighted more
         
-        return sorted(solutions, key=solution_score, reverse=True)
+        ranked = sorted(solutions, key=solution_score, reverse=True)
+        # Solutions are frozen, so rebuild only those whose stored rank moved
+        return [sol if sol.rank == i else replace(sol, rank=i) for i, sol in enumerate(ranked, 1)]
 
@@ -3,13 +3,25 @@ import os
 from dotenv import load_dotenv  # type: ignore[import-untyped]
 import sys
 import traceback
+import importlib.util
+import hashlib
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple, TYPE_CHECKING
 
 # Add agents directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import multi-agent framework
 try:
-    from agents import MultiAgentOrchestrator
+    from agents import get_orchestrator
+    # The agents import these lazily, so check they are installed up front
+    for _dependency in ("langgraph", "langchain_openai"):
+        if importlib.util.find_spec(_dependency) is None:
+            raise ImportError(f"No module named '{_dependency}'")
     MULTI_AGENT_AVAILABLE = True
 except ImportError as e:
     MULTI_AGENT_AVAILABLE = False
@@ -17,45 +29,118 @@ except ImportError as e:
     print(f"Multi-agent framework not available: {e}")
     print(f"Import traceback: {import_error}")
 
-# Fallback to old system
-from error_analyzer import ErrorAnalyzer
-from notification_agents import SlackNotifier
+# Fallback analyzer and notifiers are imported on first use (see the get_*
+# factories below), so uploads alone don't pay for openai/requests/jira
+if TYPE_CHECKING:
+    from error_analyzer import ErrorAnalyzer
+    from notification_agents import SlackNotifier, JIRANotifier
 
-# Optional JIRA import
-try:
-    from notification_agents import JIRANotifier
-    JIRA_AVAILABLE = True
-except ImportError:
-    JIRA_AVAILABLE = False
-    JIRANotifier = None
+# Optional JIRA dependency
+JIRA_AVAILABLE = importlib.util.find_spec("jira") is not None
 
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait
 
-# Load environment variables
-# Priority: Environment variables (Railway/local) > .env file (local only)
-# Railway: Environment variables are set in Railway dashboard
-# Local: Falls back to .env file if environment variables are not set
-env_file_used = None
-is_railway = (
-    os.getenv("RAILWAY_ENVIRONMENT") is not None 
-    or os.getenv("RAILWAY_PROJECT_ID") is not None
-    or os.getenv("RAILWAY") is not None
-)
-
-# Always try to load .env for local development (won't override existing env vars)
-# This allows local dev with .env file, but Railway will use its own env vars
-if not is_railway:
-    env_path = os.path.join(os.path.dirname(__file__), '.env')
-    if os.path.exists(env_path):
-        load_dotenv(env_path, override=False)  # Don't override existing env vars
-        env_file_used = env_path
+@st.cache_resource(show_spinner=False)
+def load_environment() -> Tuple[bool, Optional[str]]:
+    """Load environment variables once per process; returns (is_railway, env_file_used).
+    
+    Priority: Environment variables (Railway/local) > .env file (local only)
+    Railway: Environment variables are set in Railway dashboard
+    Local: Falls back to .env file if environment variables are not set
+    """
+    is_railway = (
+        os.getenv("RAILWAY_ENVIRONMENT") is not None 
+        or os.getenv("RAILWAY_PROJECT_ID") is not None
+        or os.getenv("RAILWAY") is not None
+    )
+    
+    # Always try to load .env for local development (won't override existing env vars)
+    # This allows local dev with .env file, but Railway will use its own env vars
+    if not is_railway:
+        env_path = os.path.join(os.path.dirname(__file__), '.env')
+        if os.path.exists(env_path):
+            load_dotenv(env_path, override=False)  # Don't override existing env vars
+            env_file_used = env_path
+        else:
+            # Try auto-detect .env file
+            load_dotenv(override=False)
+            env_file_used = "auto-detected" if os.path.exists('.env') else None
     else:
-        # Try auto-detect .env file
-        load_dotenv(override=False)
-        env_file_used = "auto-detected" if os.path.exists('.env') else None
-else:
-    # Running on Railway - environment variables are already set
-    env_file_used = "Railway environment variables"
+        # Running on Railway - environment variables are already set
+        env_file_used = "Railway environment variables"
+    return is_railway, env_file_used
+
+# Script reruns re-execute this line, but the .env probing above runs only once
+is_railway, env_file_used = load_environment()
+
+# JIRA settings that must all be set before a ticket can be created
+JIRA_REQUIRED_FIELDS = ('server', 'email', 'api_token', 'project_key')
+
+# Shape of a Slack incoming-webhook URL (commercial and GovSlack)
+_SLACK_WEBHOOK_RE = re.compile(r'^https://hooks\.slack(?:-gov)?\.com/\S+$')
+
+@dataclass(frozen=True)
+class EnvConfig:
+    """Credentials from environment variables (Railway) or .env (local)"""
+    openai_api_key: str = ""
+    openai_api_key_id: str = ""  # Digest of the key; cache identity without the raw secret
+    slack_webhook: str = ""
+    # Read-only: the config is shared by every session through cache_resource
+    jira_config: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    slack_ready: bool = False  # Webhook is set and looks like a Slack webhook URL
+    jira_ready: bool = False  # Every JIRA_REQUIRED_FIELDS value is set
+    jira_timeout: float = 30.0  # Read timeout (seconds) for JIRA API calls
+    jira_max_retries: int = 3
+    debug: bool = False  # Show full tracebacks in the UI
+    config_warnings: Tuple[str, ...] = ()  # Invalid settings that were ignored or fell back to defaults
+
+def _env_number(name: str, parse, default, config_warnings: list):
+    """Parse a numeric environment variable, falling back to the default if it is invalid"""
+    raw = os.getenv(name, "")
+    if not raw:
+        return default
+    try:
+        return parse(raw)
+    except ValueError:
+        message = f"{name}={raw!r} is not a valid number; using {default}"
+        print(message)
+        config_warnings.append(message)
+        return default
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def load_env_config() -> EnvConfig:
+    """Read and validate the credentials, at most every 5 minutes per process"""
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    slack_webhook = os.getenv("SLACK_WEBHOOK_URL", "")
+    jira_config = MappingProxyType({
+        'server': os.getenv("JIRA_SERVER", ""),
+        'email': os.getenv("JIRA_EMAIL", ""),
+        'api_token': os.getenv("JIRA_API_TOKEN", ""),
+        'project_key': os.getenv("JIRA_PROJECT_KEY", ""),
+        'issue_type': os.getenv("JIRA_ISSUE_TYPE", "") or "Task"
+    })
+    config_warnings = []
+    slack_ready = bool(_SLACK_WEBHOOK_RE.match(slack_webhook))
+    if slack_webhook and not slack_ready:
+        # The URL is a secret, so the message doesn't echo it
+        message = "SLACK_WEBHOOK_URL is not a Slack webhook URL; Slack notifications are off"
+        print(message)
+        config_warnings.append(message)
+    jira_timeout = _env_number("JIRA_TIMEOUT", float, 30.0, config_warnings)
+    jira_max_retries = _env_number("JIRA_MAX_RETRIES", int, 3, config_warnings)
+    return EnvConfig(
+        openai_api_key=api_key,
+        openai_api_key_id=hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest(),
+        slack_webhook=slack_webhook,
+        jira_config=jira_config,
+        slack_ready=slack_ready,
+        jira_ready=all(jira_config[key] for key in JIRA_REQUIRED_FIELDS),
+        jira_timeout=jira_timeout,
+        jira_max_retries=jira_max_retries,
+        debug=os.getenv("DEBUG", "").lower() in ("1", "true", "yes"),
+        config_warnings=tuple(config_warnings)
+    )
 
 # Page configuration
 st.set_page_config(
@@ -98,10 +183,8 @@ if 'analysis_result' not in st.session_state:
     st.session_state.analysis_result = None
 if 'selected_solution' not in st.session_state:
     st.session_state.selected_solution = None
-if 'log_content' not in st.session_state:
-    st.session_state.log_content = None
-if 'log_files' not in st.session_state:
-    st.session_state.log_files = []
+if 'log_preview' not in st.session_state:
+    st.session_state.log_preview = ""  # Head of the first analyzed log (see log_head)
 if 'classification_result' not in st.session_state:
     st.session_state.classification_result = None
 if 'solutions' not in st.session_state:
@@ -112,97 +195,421 @@ if 'slack_enabled' not in st.session_state:
     st.session_state.slack_enabled = True  # Default enabled
 if 'jira_enabled' not in st.session_state:
     st.session_state.jira_enabled = True  # Default enabled
+if 'celebrate' not in st.session_state:
+    st.session_state.celebrate = False  # Balloons on success are opt-in
 if 'notifications_sent' not in st.session_state:
     st.session_state.notifications_sent = False
 if 'analysis_in_progress' not in st.session_state:
     st.session_state.analysis_in_progress = False
 if 'notification_results' not in st.session_state:
     st.session_state.notification_results = None
+if 'notification_future' not in st.session_state:
+    st.session_state.notification_future = None  # Pending send_notifications job, if any
+if 'notification_keys' not in st.session_state:
+    st.session_state.notification_keys = {}  # Channel -> notification_key of the pending job
+if 'sent_notifications' not in st.session_state:
+    st.session_state.sent_notifications = {}  # notification_key -> {'ts', 'result'} of successful per-channel sends
+if 'env' not in st.session_state:
+    # Resolved once per session instead of on every rerun; new sessions share
+    # the process-wide cached config
+    st.session_state.env = load_env_config()
 
-def send_notifications(result, solution, slack_webhook, jira_config, auto_trigger=False):
-    """Helper function to send notifications"""
-    notification_results = {'slack': None, 'jira': None, 'all_success': False}
-    
-    # Get Slack webhook from environment variables (Railway) or .env (local)
-    slack_webhook_env = os.getenv("SLACK_WEBHOOK_URL", "")
-    slack_webhook_to_use = slack_webhook or slack_webhook_env
-    
-    # Get JIRA config from environment variables (Railway) or .env (local)
-    jira_server_env = os.getenv("JIRA_SERVER", "")
-    jira_email_env = os.getenv("JIRA_EMAIL", "")
-    jira_token_env = os.getenv("JIRA_API_TOKEN", "")
-    jira_project_env = os.getenv("JIRA_PROJECT_KEY", "")
-    jira_issue_type_env = os.getenv("JIRA_ISSUE_TYPE", "")
+@st.cache_resource(show_spinner=False)
+def get_analyzer(api_key_id: str, _api_key: str) -> "ErrorAnalyzer":
+    """Fallback analyzer, built once per API key and reused across reruns"""
+    # Keyed on api_key_id only; the underscore argument is not hashed
+    from error_analyzer import ErrorAnalyzer
+    return ErrorAnalyzer(_api_key)
+
+@st.cache_resource(show_spinner=False)
+def get_slack_notifier(webhook_url: str) -> "SlackNotifier":
+    """Slack notifier, built once per webhook URL"""
+    from notification_agents import SlackNotifier
+    return SlackNotifier(webhook_url)
+
+@st.cache_resource(show_spinner=False)
+def get_jira_notifier(
+    server: str,
+    email: str,
+    api_token: str,
+    timeout: float = 30.0,
+    max_retries: int = 3
+) -> "JIRANotifier":
+    """Connected JIRA notifier, built once per credential set (failed connects are retried)"""
+    from notification_agents import JIRANotifier
+    return JIRANotifier(
+        server=server,
+        email=email,
+        api_token=api_token,
+        timeout=(3.05, timeout),
+        max_retries=max_retries
+    )
+
+# Severity label shown in the results column
+SEVERITY_BADGES = MappingProxyType({
+    'Critical': '🔴 Critical',
+    'High': '🟠 High',
+    'Medium': '🟡 Medium',
+    'Low': '🟢 Low'
+})
+
+# Column card header; only the title varies
+_CARD_HEADER_HTML = '<div class="card"><div class="card-header">{title}</div></div>'
+
+def card_header(title: str) -> None:
+    """Render a column's card header"""
+    st.markdown(_CARD_HEADER_HTML.format(title=title), unsafe_allow_html=True)
+
+# Notification settings summary, rendered as one element
+_SETTINGS_STATUS_MD = "**Status:**\n- Slack: {slack}\n- JIRA: {jira}"
+_ENABLED_LABELS = ("❌ Disabled", "✅ Enabled")
+_CHANNEL_NAMES = MappingProxyType({'slack': "Slack", 'jira': "JIRA"})
+
+# Error summary at the top of the results column
+_RESULT_SUMMARY_MD = "**Error Type:** {error_type}\n\n**Severity:** {severity_badge}"
+
+# Characters of the first log file attached to JIRA tickets
+LOG_HEAD_CHARS = 5000
+
+# error_type values ErrorAnalyzer returns when the LLM call itself failed
+_ANALYSIS_FAILURE_TYPES = frozenset({'JSON Parse Error', 'Analysis Error'})
+
+class _AnalysisFailed(Exception):
+    """Carries a failed analysis out of _cached_analysis so it is not cached"""
+    def __init__(self, result):
+        super().__init__(result.get('error_type'))
+        self.result = result
+
+@st.cache_data(persist="disk", max_entries=256, show_spinner=False)
+def _cached_analysis(api_key_id: str, log_sha: str, _api_key: str, _log_bytes: bytes):
+    # Persisted to disk so identical logs survive restarts/redeploys (Streamlit
+    # ignores ttl for persisted caches). Underscore arguments are not hashed:
+    # the key is identified by api_key_id and the log by log_sha. The log is
+    # decoded here, so cache hits never decode it at all.
+    log_content = _log_bytes.decode('utf-8', errors='ignore')
+    result = get_analyzer(api_key_id, _api_key).analyze_errors(log_content)
+    if result.get('error_type') in _ANALYSIS_FAILURE_TYPES:
+        raise _AnalysisFailed(result)
+    return result
+
+def run_analysis(env: EnvConfig, log_sha: str, log_bytes: bytes):
+    """Analyze a raw log with the fallback analyzer; identical logs are answered from cache"""
+    api_key_id, api_key = env.openai_api_key_id, env.openai_api_key
+    try:
+        return _cached_analysis(api_key_id, log_sha, api_key, log_bytes)
+    except _AnalysisFailed as e:
+        return e.result
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def upload_stats(file_id: str, _log_bytes: bytes) -> Tuple[int, str]:
+    """(line count, content digest) of an upload, computed once per upload.
     
-    jira_config_to_use = jira_config or {
-        'server': jira_server_env,
-        'email': jira_email_env,
-        'api_token': jira_token_env,
-        'project_key': jira_project_env,
-        'issue_type': jira_issue_type_env or "Task"
+    Keyed on the uploader's per-upload file_id; the bytes themselves are not
+    hashed, so a cache hit does no O(n) work at all.
+    """
+    lines = _log_bytes.count(b'\n') + (not _log_bytes.endswith(b'\n')) if _log_bytes else 0
+    return lines, hashlib.blake2b(_log_bytes, digest_size=16).hexdigest()
+
+def log_head(log_bytes: bytes) -> str:
+    """First LOG_HEAD_CHARS characters of a log, for JIRA tickets"""
+    if not log_bytes:
+        return ""
+    # A UTF-8 character is at most 4 bytes, so only this prefix needs decoding
+    return log_bytes[:LOG_HEAD_CHARS * 4].decode('utf-8', errors='ignore')[:LOG_HEAD_CHARS]
+
+def report_error(message: str, error: Exception, log_label: str) -> None:
+    """Show a short error; the traceback goes to the server log (and the UI only in DEBUG)"""
+    error_details = traceback.format_exc()
+    # Log to console for Railway logs
+    print(f"{log_label}: {error_details}")
+    st.error(f"❌ {message}: {type(error).__name__}: {error}")
+    if st.session_state.env.debug:
+        with st.expander("🔍 View detailed error", expanded=False):
+            st.code(error_details, language="python")
+
+def notification_channels(env: EnvConfig) -> Tuple[str, ...]:
+    """Enabled integrations ('slack', 'jira') with enough configuration to send"""
+    slack_ok = st.session_state.slack_enabled and env.slack_ready
+    jira_ok = st.session_state.jira_enabled and JIRA_AVAILABLE and env.jira_ready
+    return tuple(channel for channel, ok in (('slack', slack_ok), ('jira', jira_ok)) if ok)
+
+def notifications_configured(env: EnvConfig) -> bool:
+    """Whether any enabled integration has enough configuration to send"""
+    return bool(notification_channels(env))
+
+def notification_payload(result, solution) -> Dict:
+    """Fields shared by the Slack message and the JIRA ticket"""
+    return {
+        'error_type': result.get('error_type'),
+        'severity': result.get('severity'),
+        'causes': result.get('causes', []),
+        'selected_solution': solution
     }
+
+def _send_slack(payload, slack_webhook):
+    """Post the Slack notification; returns its status entry"""
+    try:
+        notifier = get_slack_notifier(slack_webhook)
+        success = notifier.send_error_notification(**payload)
+        return {'success': success, 'error': None if success else 'Failed to send'}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+def _send_jira(payload, jira_config, log_content, env):
+    """Create the JIRA ticket; returns its status entry"""
+    try:
+        notifier = get_jira_notifier(
+            jira_config['server'],
+            jira_config['email'],
+            jira_config['api_token'],
+            env.jira_timeout,
+            env.jira_max_retries
+        )
+        ticket = notifier.create_error_ticket(
+            project_key=jira_config['project_key'],
+            log_content=log_content,
+            issue_type=jira_config.get('issue_type', 'Task'),
+            **payload
+        )
+        return {'success': ticket is not None, 'ticket': ticket, 'error': None if ticket else 'Failed to create'}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+def send_notifications(result, solution, slack_enabled, jira_enabled, log_content, env, already_sent=None):
+    """Send the Slack/JIRA notifications and return their outcome.
     
-    # Send Slack notification
-    if st.session_state.slack_enabled and slack_webhook_to_use:
-        try:
-            notifier = SlackNotifier(slack_webhook_to_use)
-            success = notifier.send_error_notification(
-                error_type=result.get('error_type'),
-                severity=result.get('severity'),
-                causes=result.get('causes', []),
-                selected_solution=solution
-            )
-            notification_results['slack'] = {'success': success, 'error': None if success else 'Failed to send'}
-        except Exception as e:
-            notification_results['slack'] = {'success': False, 'error': str(e)}
+    Runs on the notification executor, so it must not touch st.session_state;
+    start_notifications() snapshots everything it needs. Channels in
+    already_sent (channel -> recorded status entry) are not sent again.
+    """
+    notification_results = {'slack': None, 'jira': None, 'all_success': False}
+    notification_results.update(already_sent or {})
+    payload = notification_payload(result, solution)
     
-    # Send JIRA notification
-    if st.session_state.jira_enabled and JIRA_AVAILABLE and jira_config_to_use.get('server') and jira_config_to_use.get('email') and jira_config_to_use.get('api_token') and jira_config_to_use.get('project_key'):
-        try:
-            notifier = JIRANotifier(
-                server=jira_config_to_use['server'],
-                email=jira_config_to_use['email'],
-                api_token=jira_config_to_use['api_token']
-            )
-            ticket = notifier.create_error_ticket(
-                project_key=jira_config_to_use['project_key'],
-                error_type=result.get('error_type'),
-                severity=result.get('severity'),
-                causes=result.get('causes', []),
-                selected_solution=solution,
-                log_content=st.session_state.log_content[:5000] if st.session_state.log_content else "",
-                issue_type=jira_config_to_use.get('issue_type', 'Task')
-            )
-            notification_results['jira'] = {'success': ticket is not None, 'ticket': ticket, 'error': None if ticket else 'Failed to create'}
-        except Exception as e:
-            notification_results['jira'] = {'success': False, 'error': str(e)}
+    # Both calls block on the network, so run them side by side: the send takes
+    # max(slack, jira) rather than the sum
+    executor = _integration_executor()
+    futures = {}
+    if slack_enabled and env.slack_ready and notification_results['slack'] is None:
+        futures['slack'] = executor.submit(_send_slack, payload, env.slack_webhook)
+    if jira_enabled and JIRA_AVAILABLE and env.jira_ready and notification_results['jira'] is None:
+        futures['jira'] = executor.submit(_send_jira, payload, env.jira_config, log_content, env)
+    wait(futures.values())
+    for name, future in futures.items():
+        notification_results[name] = future.result()
     
     notification_results['all_success'] = (
-        (not st.session_state.slack_enabled or notification_results['slack'] is None or notification_results['slack'].get('success')) and
-        (not st.session_state.jira_enabled or notification_results['jira'] is None or notification_results['jira'].get('success'))
+        (not slack_enabled or notification_results['slack'] is None or notification_results['slack'].get('success')) and
+        (not jira_enabled or notification_results['jira'] is None or notification_results['jira'].get('success'))
     )
     
     return notification_results
 
-def main():
-    # Get API key from environment variables (Railway) or .env (local)
-    api_key = os.getenv("OPENAI_API_KEY", "")
-    if api_key:
-        os.environ["OPENAI_API_KEY"] = api_key
+@st.cache_resource(show_spinner=False)
+def _notification_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by all sessions, so Slack/JIRA round-trips don't block script runs"""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="notify")
+
+@st.cache_resource(show_spinner=False)
+def _integration_executor() -> ThreadPoolExecutor:
+    """Pool for the individual Slack/JIRA calls of a send.
+    
+    Separate from _notification_executor: send_notifications waits on these
+    calls, and waiting on its own pool could deadlock once every worker is busy.
+    """
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="notify-io")
+
+def notification_key(result, solution, channel: str) -> str:
+    """Digest of what a send would deliver, and to which channel"""
+    key_data = (notification_payload(result, solution), channel)
+    encoded = json.dumps(key_data, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+def start_notifications(result, solution):
+    """Send notifications in the background; notification_progress() collects the outcome.
+    
+    A channel that already delivered this notification in this session is
+    not sent to again, so retrying after a partial failure only resends the
+    failed channel; the recorded outcome is shown for the others.
+    """
+    env = st.session_state.env
+    st.session_state.notification_results = None
+    st.session_state.notifications_sent = False
+    if not notifications_configured(env):
+        return  # Nothing to send; don't occupy a worker
+    
+    channels = notification_channels(env)
+    keys = {channel: notification_key(result, solution, channel) for channel in channels}
+    sent = {
+        channel: st.session_state.sent_notifications[key]
+        for channel, key in keys.items()
+        if key in st.session_state.sent_notifications
+    }
+    already_sent = {channel: entry['result'] for channel, entry in sent.items()}
+    if sent:
+        last_ts = max(entry['ts'] for entry in sent.values())
+        names = " and ".join(_CHANNEL_NAMES[channel] for channel in sent)
+        st.toast(f"{names} already sent at {time.strftime('%H:%M:%S', time.localtime(last_ts))}")
+    if len(sent) == len(channels):
+        st.session_state.notification_results = {
+            'slack': already_sent.get('slack'),
+            'jira': already_sent.get('jira'),
+            'all_success': True
+        }
+        st.session_state.notifications_sent = True
+        return
+    
+    st.session_state.notification_keys = keys
+    st.session_state.notification_future = _notification_executor().submit(
+        send_notifications,
+        result,
+        solution,
+        st.session_state.slack_enabled,
+        st.session_state.jira_enabled,
+        st.session_state.log_preview,
+        env,
+        already_sent
+    )
+
+@st.fragment(run_every=0.5)
+def notification_progress():
+    """Poll the in-flight notification job; notification_panel renders it while one is pending"""
+    future = st.session_state.notification_future
+    if not future.done():
+        st.info("📢 Sending notifications...")
+        return
+    
+    st.session_state.notification_future = None
+    try:
+        results = future.result()
+        st.session_state.notification_results = results
+        # Recorded per channel, so a retry after a partial failure skips what went out
+        for channel, key in st.session_state.notification_keys.items():
+            status = results.get(channel)
+            if status and status.get('success') and key not in st.session_state.sent_notifications:
+                st.session_state.sent_notifications[key] = {'ts': time.time(), 'result': status}
+    except Exception as e:
+        st.session_state.notification_results = {
+            'slack': None,
+            'jira': None,
+            'all_success': False,
+            'error': str(e)
+        }
+    st.session_state.notifications_sent = True
+    # App-scope: a fragment rerun here would only redraw this poller, not the
+    # enclosing notification_panel that shows the outcome
+    st.rerun()
+
+@st.fragment
+def notification_panel(result, solution):
+    """Notification status and the on-demand send button.
+    
+    A fragment, so "Send Notifications Now" reruns only this panel rather
+    than the whole dashboard; the nested notification_progress fragment
+    polls the job that the button starts.
+    """
+    if st.session_state.notification_future is not None:
+        notification_progress()
+    
+    # Display notification results from session state
+    notification_results = st.session_state.notification_results
+    
+    if not notification_results and not notifications_configured(st.session_state.env):
+        st.info("💡 No notification integration is configured — enable Slack or JIRA in the sidebar and set its environment variables")
+        return
+    
+    if notification_results:
+        st.divider()
+        st.markdown("### 📊 Notification Status")
         
+        # Slack status
+        if st.session_state.slack_enabled:
+            if notification_results.get('slack'):
+                slack_result = notification_results['slack']
+                if slack_result.get('success'):
+                    st.success("✅ **Slack:** Notification sent successfully")
+                else:
+                    error_msg = slack_result.get('error', 'Unknown error')
+                    st.error(f"❌ **Slack:** {error_msg}")
+            else:
+                st.info("ℹ️ **Slack:** Not attempted")
+        else:
+            st.info("ℹ️ **Slack:** Disabled")
+        
+        # JIRA status
+        if st.session_state.jira_enabled:
+            if notification_results.get('jira'):
+                jira_result = notification_results['jira']
+                if jira_result.get('success'):
+                    ticket = jira_result.get('ticket', {})
+                    ticket_key = ticket.get('key', 'Created') if ticket else 'Created'
+                    # The ticket link goes in the same element as the status
+                    ticket_link = f" — 🔗 [View Ticket]({ticket['url']})" if ticket and ticket.get('url') else ""
+                    st.success(f"✅ **JIRA:** Ticket {ticket_key} created successfully{ticket_link}")
+                else:
+                    error_msg = jira_result.get('error', 'Unknown error')
+                    st.error(f"❌ **JIRA:** {error_msg}")
+            else:
+                st.info("ℹ️ **JIRA:** Not attempted")
+        else:
+            st.info("ℹ️ **JIRA:** Disabled")
+        
+        # Overall status
+        if notification_results.get('all_success') and st.session_state.celebrate:
+            st.balloons()
+    elif st.session_state.notifications_sent:
+        st.info("💡 Notifications were sent. Check status above.")
+    else:
+        st.info("💡 Notifications will be sent automatically when you select a solution")
+    
+    # On-demand trigger button
+    st.divider()
+    pending = st.session_state.notification_future is not None
+    if st.button("📢 Send Notifications Now", type="primary", use_container_width=True, disabled=pending):
+        start_notifications(result, solution)
+        st.rerun(scope="fragment")  # Redraw the panel so notification_progress starts polling
+    
+    # Notification settings status
+    st.divider()
+    st.markdown(_SETTINGS_STATUS_MD.format(
+        slack=_ENABLED_LABELS[bool(st.session_state.slack_enabled)],
+        jira=_ENABLED_LABELS[bool(st.session_state.jira_enabled)]
+    ))
+
+def main():
+    env = st.session_state.env
+    api_key = env.openai_api_key
+    
     # Simplified Sidebar - Collapsible Navigation
     with st.sidebar:
-        st.markdown("### 📢 Notifications")
-        st.session_state.slack_enabled = st.checkbox(
-            "📢 Slack",
-            value=st.session_state.slack_enabled,
-            help="Enable Slack notifications"
-        )
-        st.session_state.jira_enabled = st.checkbox(
-            "🎫 JIRA",
-            value=st.session_state.jira_enabled,
-            help="Enable JIRA ticket creation"
-        )
+        # A form, so toggling the checkboxes reruns the app once on Apply, not per click
+        with st.form("notification_settings"):
+            st.markdown("### 📢 Notifications")
+            slack_enabled = st.checkbox(
+                "📢 Slack",
+                value=st.session_state.slack_enabled,
+                help="Enable Slack notifications"
+            )
+            jira_enabled = st.checkbox(
+                "🎫 JIRA",
+                value=st.session_state.jira_enabled,
+                help="Enable JIRA ticket creation"
+            )
+            celebrate = st.checkbox(
+                "🎈 Celebrate successes",
+                value=st.session_state.celebrate,
+                help="Show balloons when every notification succeeds"
+            )
+            if st.form_submit_button("Apply", use_container_width=True):
+                st.session_state.slack_enabled = slack_enabled
+                st.session_state.jira_enabled = jira_enabled
+                st.session_state.celebrate = celebrate
+        
+        # Notifier clients are cached across reruns; drop them to force a fresh JIRA login
+        if st.button("🔄 Reconnect", help="Recreate the Slack and JIRA clients", use_container_width=True):
+            get_slack_notifier.clear()
+            get_jira_notifier.clear()
+            st.toast("Notification clients will reconnect on next use")
     
     # Main Header
     st.markdown("""
@@ -217,27 +624,15 @@ def main():
         st.success("✅ Multi-Agent Framework (LangGraph) Enabled")
     else:
         st.warning("⚠️ Multi-Agent Framework not available, using fallback mode")
-    
-    # Get credentials from environment variables (Railway) or .env (local)
-    slack_webhook = os.getenv("SLACK_WEBHOOK_URL", "")
-    jira_config = {
-        'server': os.getenv("JIRA_SERVER", ""),
-        'email': os.getenv("JIRA_EMAIL", ""),
-        'api_token': os.getenv("JIRA_API_TOKEN", ""),
-        'project_key': os.getenv("JIRA_PROJECT_KEY", ""),
-        'issue_type': os.getenv("JIRA_ISSUE_TYPE", "Task")
-    }
+    for warning in env.config_warnings:
+        st.warning(f"⚠️ {warning}")
     
     # 3-Column Layout
     col1, col2, col3 = st.columns(3)
     
     # Column 1: Upload & Analyze Card
     with col1:
-        st.markdown("""
-        <div class="card">
-            <div class="card-header">📤 Upload & Analyze</div>
-        </div>
-        """, unsafe_allow_html=True)
+        card_header("📤 Upload & Analyze")
         
         if not api_key:
             if is_railway:
@@ -255,31 +650,28 @@ def main():
         )
         
         if uploaded_files:
-            # Process files
-            log_files_data = []
-            total_size = 0
-            total_lines = 0
+            # Process files: raw bytes only; sizes and line counts need no decoding.
+            # getvalue() on an unread UploadedFile (a BytesIO) returns the upload's
+            # own bytes object without copying; read(), getbuffer() or spooling to a
+            # temp file would each make another full copy.
+            uploads = [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+            stats = [
+                upload_stats(uploaded_file.file_id, log_bytes)
+                for uploaded_file, (_, log_bytes) in zip(uploaded_files, uploads)
+            ]
+            total_size = sum(len(log_bytes) for _, log_bytes in uploads)
+            total_lines = sum(lines for lines, _ in stats)
+            # Identifies the first file for the analysis cache
+            st.session_state.log_sha = stats[0][1]
             
-            for uploaded_file in uploaded_files:
-                log_content = uploaded_file.read().decode('utf-8', errors='ignore')
-                log_files_data.append({
-                    'filename': uploaded_file.name,
-                    'content': log_content
-                })
-                total_size += len(log_content)
-                total_lines += len(log_content.splitlines())
-            
-            st.session_state.log_files = log_files_data
-            if log_files_data:
-                st.session_state.log_content = log_files_data[0]['content']
-            
-            # File info
-            st.info(f"📁 {len(uploaded_files)} file(s) | {total_size:,} chars | {total_lines:,} lines")
+            # File info; sizes are raw upload bytes (the label said chars when
+            # each file was decoded first), so non-ASCII logs read larger
+            st.info(f"📁 {len(uploaded_files)} file(s) | {total_size:,} bytes | {total_lines:,} lines")
             
             # Analyze button
             if st.button("🔍 Analyze Errors", type="primary", use_container_width=True):
                 # Debug: Log button click for Railway troubleshooting
-                num_files = len(log_files_data) if uploaded_files else 0
+                num_files = len(uploads)
                 print(f"[DEBUG] Analyze button clicked. API key present: {bool(api_key)}, Multi-agent available: {MULTI_AGENT_AVAILABLE}, Files: {num_files}")
                 try:
                     if not api_key:
@@ -303,98 +695,79 @@ def main():
                         st.session_state.notification_results = None
                         st.session_state.notifications_sent = False
                         
+                        # Decoded once here rather than on every notification send
+                        st.session_state.log_preview = log_head(uploads[0][1])
+                        
                         if MULTI_AGENT_AVAILABLE and st.session_state.use_multi_agent:
                             with st.spinner("🤖 Multi-Agent Analysis in progress..."):
                                 try:
-                                    orchestrator = MultiAgentOrchestrator(
+                                    # Decode only when the logs are actually analyzed, not on every rerun
+                                    log_files_data = [
+                                        {'filename': name, 'content': log_bytes.decode('utf-8', errors='ignore')}
+                                        for name, log_bytes in uploads
+                                    ]
+                                    orchestrator = get_orchestrator(
                                         api_key=api_key,
-                                        slack_webhook=slack_webhook if st.session_state.slack_enabled else None,
-                                        jira_config=jira_config if st.session_state.jira_enabled else None
+                                        slack_webhook=env.slack_webhook if st.session_state.slack_enabled and env.slack_ready else None,
+                                        jira_config=dict(env.jira_config) if st.session_state.jira_enabled and env.jira_ready else None
                                     )
                                     result = orchestrator.run_workflow(
                                         log_files=log_files_data,
                                         send_notifications=False
                                     )
-                                    st.session_state.classification_result = result.get('classification_result')
-                                    st.session_state.solutions = result.get('solutions')
+                                    classification_result = result.get('classification_result')
+                                    solutions = result.get('solutions')
+                                    st.session_state.classification_result = classification_result
+                                    st.session_state.solutions = solutions
+                                    # Built once here; the result and notification columns render it as is
+                                    aggregated_analysis = (classification_result or {}).get('aggregated_analysis') or {}
                                     st.session_state.analysis_result = {
-                                        'error_type': result.get('classification_result', {}).get('aggregated_analysis', {}).get('primary_issue_category', 'Unknown'),
-                                        'severity': result.get('classification_result', {}).get('aggregated_analysis', {}).get('overall_severity', 'Medium'),
-                                        'causes': [{'title': f, 'description': f} for f in result.get('classification_result', {}).get('aggregated_analysis', {}).get('key_findings', [])],
-                                        'solutions': result.get('solutions', [])
+                                        'error_type': aggregated_analysis.get('primary_issue_category', 'Unknown'),
+                                        'severity': aggregated_analysis.get('overall_severity', 'Medium'),
+                                        'causes': [{'title': f, 'description': f} for f in aggregated_analysis.get('key_findings', [])],
+                                        'solutions': solutions or []
                                     }
                                     st.session_state.analysis_in_progress = False
                                     st.success("✅ Analysis complete!")
                                     st.rerun()  # Rerun to update UI with results
                                 except Exception as e:
                                     st.session_state.analysis_in_progress = False
-                                    error_details = traceback.format_exc()
-                                    st.error(f"❌ Error during multi-agent analysis: {str(e)}")
-                                    with st.expander("🔍 View detailed error", expanded=False):
-                                        st.code(error_details, language="python")
-                                    # Log to console for Railway logs
-                                    print(f"Multi-agent analysis error: {error_details}")
+                                    report_error("Error during multi-agent analysis", e, "Multi-agent analysis error")
                         else:
-                            if len(log_files_data) > 1:
+                            if len(uploads) > 1:
                                 st.warning("⚠️ Analyzing first file only (multi-agent not available)")
                             with st.spinner("🤖 Analyzing..."):
                                 try:
-                                    analyzer = ErrorAnalyzer(api_key)
-                                    result = analyzer.analyze_errors(log_files_data[0]['content'])
+                                    result = run_analysis(
+                                        env, st.session_state.log_sha, uploads[0][1]
+                                    )
                                     st.session_state.analysis_result = result
                                     st.session_state.analysis_in_progress = False
                                     st.success("✅ Analysis complete!")
                                     st.rerun()  # Rerun to update UI with results
                                 except Exception as e:
                                     st.session_state.analysis_in_progress = False
-                                    error_details = traceback.format_exc()
-                                    st.error(f"❌ Error during analysis: {str(e)}")
-                                    with st.expander("🔍 View detailed error", expanded=False):
-                                        st.code(error_details, language="python")
-                                    # Log to console for Railway logs
-                                    print(f"Error analysis error: {error_details}")
+                                    report_error("Error during analysis", e, "Error analysis error")
                 except Exception as outer_e:
                     # Catch any unexpected errors in the button handler
-                    error_details = traceback.format_exc()
-                    st.error(f"❌ Unexpected error: {str(outer_e)}")
-                    with st.expander("🔍 View detailed error", expanded=False):
-                        st.code(error_details, language="python")
-                    print(f"Unexpected error in analyze button: {error_details}")
+                    report_error("Unexpected error", outer_e, "Unexpected error in analyze button")
     
     # Column 2: Analysis Results Card
     with col2:
-        st.markdown("""
-        <div class="card">
-            <div class="card-header">📊 Analysis Results</div>
-        </div>
-        """, unsafe_allow_html=True)
+        card_header("📊 Analysis Results")
         
-        if st.session_state.analysis_result is None and st.session_state.classification_result is None:
+        if st.session_state.analysis_result is None:
             st.info("👆 Upload and analyze files first")
         else:
-            # Get result data
-            if st.session_state.classification_result:
-                classification_result = st.session_state.classification_result
-                aggregated_analysis = classification_result.get('aggregated_analysis', {})
-                result = {
-                    'error_type': aggregated_analysis.get('primary_issue_category', 'Unknown'),
-                    'severity': aggregated_analysis.get('overall_severity', 'Medium'),
-                    'causes': [{'title': f, 'description': f} for f in aggregated_analysis.get('key_findings', [])],
-                    'solutions': st.session_state.solutions or []
-                }
-            else:
-                result = st.session_state.analysis_result
+            # Both analysis paths store their summary here (multi-agent results are mapped once, on completion)
+            result = st.session_state.analysis_result
             
             # Display error info
-            st.markdown(f"**Error Type:** {result.get('error_type', 'Unknown')}")
             severity = result.get('severity', 'Unknown')
-            severity_badge = {
-                'Critical': '🔴 Critical',
-                'High': '🟠 High',
-                'Medium': '🟡 Medium',
-                'Low': '🟢 Low'
-            }.get(severity, f'⚪ {severity}')
-            st.markdown(f"**Severity:** {severity_badge}")
+            st.markdown(_RESULT_SUMMARY_MD.format_map({
+                'error_type': result.get('error_type', 'Unknown'),
+                'severity_badge': SEVERITY_BADGES.get(severity) or f'⚪ {severity}'
+            }))
             
             # Solutions
             solutions = result.get('solutions', [])
@@ -410,108 +783,25 @@ def main():
                             
                             # Auto-trigger notifications if enabled
                             if (st.session_state.slack_enabled or st.session_state.jira_enabled):
-                                with st.spinner("📢 Sending notifications..."):
-                                    notification_results = send_notifications(
-                                        result, solution, slack_webhook, jira_config, auto_trigger=True
-                                    )
-                                    st.session_state.notification_results = notification_results
-                                    st.session_state.notifications_sent = True
+                                start_notifications(result, solution)
                             st.rerun()
             else:
                 st.warning("No solutions available")
     
     # Column 3: Notifications Card
     with col3:
-        st.markdown("""
-        <div class="card">
-            <div class="card-header">📢 Notifications</div>
-        </div>
-        """, unsafe_allow_html=True)
+        card_header("📢 Notifications")
         
-        if st.session_state.selected_solution is None:
+        solution = st.session_state.selected_solution
+        if solution is None:
             st.info("👆 Select a solution first")
         else:
-            # Get result data
-            if st.session_state.classification_result:
-                classification_result = st.session_state.classification_result
-                aggregated_analysis = classification_result.get('aggregated_analysis', {})
-                result = {
-                    'error_type': aggregated_analysis.get('primary_issue_category', 'Unknown'),
-                    'severity': aggregated_analysis.get('overall_severity', 'Medium'),
-                    'causes': [{'title': f, 'description': f} for f in aggregated_analysis.get('key_findings', [])]
-                }
-            else:
-                result = st.session_state.analysis_result
-            
-            solution = st.session_state.selected_solution
+            result = st.session_state.analysis_result
             
             st.markdown(f"**Selected:** {solution.get('title', 'Unknown')}")
             
-            # Display notification results from session state
-            notification_results = st.session_state.notification_results
-            
-            if notification_results:
-                st.divider()
-                st.markdown("### 📊 Notification Status")
-                
-                # Slack status
-                if st.session_state.slack_enabled:
-                    if notification_results.get('slack'):
-                        slack_result = notification_results['slack']
-                        if slack_result.get('success'):
-                            st.success("✅ **Slack:** Notification sent successfully")
-                        else:
-                            error_msg = slack_result.get('error', 'Unknown error')
-                            st.error(f"❌ **Slack:** {error_msg}")
-                    else:
-                        st.info("ℹ️ **Slack:** Not attempted")
-                else:
-                    st.info("ℹ️ **Slack:** Disabled")
-                
-                # JIRA status
-                if st.session_state.jira_enabled:
-                    if notification_results.get('jira'):
-                        jira_result = notification_results['jira']
-                        if jira_result.get('success'):
-                            ticket = jira_result.get('ticket', {})
-                            ticket_key = ticket.get('key', 'Created') if ticket else 'Created'
-                            st.success(f"✅ **JIRA:** Ticket {ticket_key} created successfully")
-                            if ticket and ticket.get('url'):
-                                st.markdown(f"🔗 [View Ticket]({ticket.get('url')})")
-                        else:
-                            error_msg = jira_result.get('error', 'Unknown error')
-                            st.error(f"❌ **JIRA:** {error_msg}")
-                    else:
-                        st.info("ℹ️ **JIRA:** Not attempted")
-                else:
-                    st.info("ℹ️ **JIRA:** Disabled")
-                
-                # Overall status
-                if notification_results.get('all_success'):
-                    st.balloons()
-            elif st.session_state.notifications_sent:
-                st.info("💡 Notifications were sent. Check status above.")
-            else:
-                st.info("💡 Notifications will be sent automatically when you select a solution")
-            
-            # On-demand trigger button
-            st.divider()
-            if st.button("📢 Send Notifications Now", type="primary", use_container_width=True):
-                with st.spinner("Sending notifications..."):
-                    notification_results = send_notifications(
-                        result, solution, slack_webhook, jira_config, auto_trigger=False
-                    )
-                    st.session_state.notification_results = notification_results
-                    st.session_state.notifications_sent = True
-                st.rerun()
-            
-            # Notification settings status
-            st.divider()
-            st.markdown("**Status:**")
-            slack_status = "✅ Enabled" if st.session_state.slack_enabled else "❌ Disabled"
-            jira_status = "✅ Enabled" if st.session_state.jira_enabled else "❌ Disabled"
-            st.markdown(f"- Slack: {slack_status}")
-            st.markdown(f"- JIRA: {jira_status}")
+            # Status, progress and the send button rerun on their own (see notification_panel)
+            notification_panel(result, solution)
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,21 @@
 from openai import OpenAI  # type: ignore[import-untyped]
 import json
-import re
 from typing import Dict, List, Any
 
+from log_scan import extract_error_lines, keyword_pattern
+
+# Any of these (case-insensitive) marks a line as an error line. One compiled
+# alternation scans the log once instead of a Python loop per keyword.
+_ERROR_KEYWORDS = (
+    'error', 'exception', 'failed', 'failure', 'fatal',
+    'traceback', 'stack trace', 'err', 'critical',
+    'panic', 'abort', 'timeout', 'denied', 'forbidden'
+)
+_ERROR_KEYWORD_RE = keyword_pattern(_ERROR_KEYWORDS)
+
+# Error lines sent to the LLM (the most recent ones)
+MAX_ERROR_LINES = 50
+
 class ErrorAnalyzer:
     """Analyzes log files for errors using OpenRouter LLM"""
     
@@ -14,23 +27,8 @@ class ErrorAnalyzer:
         self.model = "openai/gpt-4o-mini"  # Using cost-effective model via OpenRouter
     
     def extract_error_lines(self, log_content: str) -> List[str]:
-        """Extract lines that likely contain errors"""
-        error_keywords = [
-            'error', 'exception', 'failed', 'failure', 'fatal',
-            'traceback', 'stack trace', 'err', 'critical',
-            'panic', 'abort', 'timeout', 'denied', 'forbidden'
-        ]
-        
-        lines = log_content.split('\n')
-        error_lines = []
-        
-        for line in lines:
-            line_lower = line.lower()
-            if any(keyword in line_lower for keyword in error_keywords):
-                error_lines.append(line)
-        
-        # Return last 50 error lines to avoid token limits
-        return error_lines[-50:] if len(error_lines) > 50 else error_lines
+        """Extract the last MAX_ERROR_LINES lines that likely contain errors"""
+        return extract_error_lines(log_content, _ERROR_KEYWORD_RE, MAX_ERROR_LINES)
     
     def analyze_errors(self, log_content: str) -> Dict[str, Any]:
         """Analyze log content and return structured error analysis"""
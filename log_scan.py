@@ -0,0 +1,43 @@
+"""
+Error-line extraction shared by the fallback ErrorAnalyzer and the
+multi-agent ErrorClassificationAgent
+"""
+import re
+from collections import deque
+from typing import List
+
+
+def keyword_pattern(keywords) -> "re.Pattern[str]":
+    """Case-sensitive alternation of keywords, for matching lowercased text"""
+    return re.compile('|'.join(map(re.escape, keywords)))
+
+
+def extract_error_lines(text: str, pattern: "re.Pattern[str]", limit: int) -> List[str]:
+    """Return the last limit lines of text that contain a pattern match.
+
+    pattern holds lowercase keywords (see keyword_pattern) and is matched
+    against the lowercased text in one scan, slicing out only the matching
+    lines, so the log is never split into one string per line.
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A few non-ASCII characters change length when lowercased, which
+        # would misalign offsets; match line by line instead
+        line_re = re.compile(pattern.pattern, re.IGNORECASE)
+        error_lines = [line for line in text.split('\n') if line_re.search(line)]
+        return error_lines[-limit:]
+
+    # Keep only the last lines to avoid token limits
+    error_lines = deque(maxlen=limit)
+    pos = 0
+    while True:
+        match = pattern.search(lowered, pos)
+        if match is None:
+            break
+        start = text.rfind('\n', 0, match.start()) + 1
+        end = text.find('\n', match.end())
+        if end == -1:
+            end = len(text)
+        error_lines.append(text[start:end])
+        pos = end + 1
+    return list(error_lines)
@@ -1,30 +1,150 @@
-import requests  # type: ignore[import-untyped]
+import httpx  # type: ignore[import-untyped]
+from requests.adapters import HTTPAdapter  # type: ignore[import-untyped]
+from urllib3.util.retry import Retry  # type: ignore[import-untyped]
+import importlib.util
 import json
-from typing import Dict, List, Any, Optional
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Any, Optional, TypeVar
 from datetime import datetime
+from types import MappingProxyType
+
+_T = TypeVar('_T')
+
+# Optional JIRA dependency. Only probed here: the package (and its oauthlib/
+# requests-toolbelt stack) is imported when a JIRANotifier is first built, so
+# Slack-only callers don't pay for it.
+JIRA_AVAILABLE = importlib.util.find_spec("jira") is not None
+
+# HTTP/2 for Slack needs the optional h2 package (httpx[http2]); without it
+# the client still pools HTTP/1.1 connections
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Slack webhook timeout (connect 3.05s, everything else 10s)
+SLACK_TIMEOUT = httpx.Timeout(10.0, connect=3.05)
+
+# Slack attachment color per severity
+_SLACK_SEVERITY_COLORS = MappingProxyType({
+    'Critical': '#FF0000',
+    'High': '#FF6B6B',
+    'Medium': '#FFA500',
+    'Low': '#FFD700'
+})
+
+# Slack webhook statuses worth retrying
+_SLACK_TRANSIENT_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class SlackTransientError(Exception):
+    """Slack answered with a status that may succeed on retry (429/5xx)"""
+    
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"Slack webhook returned {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after  # Seconds Slack asked us to wait, if it said
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header given as delta-seconds, else None"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None  # HTTP-date form; Slack and JIRA send seconds
+
+
+def _retry(
+    fn: Callable[[], _T],
+    *,
+    max_attempts: int = 3,
+    base: float = 1.0,
+    cap: float = 30.0,
+    retry_on: tuple = (httpx.TransportError, SlackTransientError)
+) -> _T:
+    """Call fn, retrying retry_on errors with full-jitter exponential backoff.
+    
+    Sleeps uniform(0, min(cap, base * 2**attempt)) between attempts, so many
+    clients failing together don't retry in lockstep. An error carrying a
+    retry_after (the server's own Retry-After) is waited out exactly instead,
+    still bounded by cap. Re-raises the last error.
+    """
+    for attempt in range(max_attempts):
+        try:
+            return fn()
+        except retry_on as e:
+            if attempt == max_attempts - 1:
+                raise
+            retry_after = getattr(e, 'retry_after', None)
+            if retry_after is not None:
+                time.sleep(min(cap, retry_after))
+            else:
+                time.sleep(random.uniform(0, min(cap, base * 2 ** attempt)))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open"""
+    
+    def __init__(self, service: str, retry_in: float):
+        super().__init__(
+            f"{service} is failing repeatedly; skipped the request (circuit open, retry in {retry_in:.0f}s)"
+        )
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Per-endpoint circuit breaker, used as a context manager around a call.
+    
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast with CircuitOpenError for reset_seconds, instead of each waiting
+    out connect/read timeouts. The next call after that is a trial: success
+    closes the circuit, failure reopens it. Thread-safe, since notifiers are
+    shared by the notification worker threads.
+    """
+    
+    def __init__(self, service: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def __enter__(self):
+        with self._lock:
+            if self._opened_at is not None:
+                retry_in = self.reset_seconds - (time.monotonic() - self._opened_at)
+                if retry_in > 0:
+                    raise CircuitOpenError(self.service, retry_in)
+                # Half-open: let this call through, keep others out, and
+                # reopen on its failure
+                self._opened_at = time.monotonic()
+                self._failures = self.failure_threshold - 1
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            if exc_type is None:
+                self._failures = 0
+                self._opened_at = None
+            else:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._opened_at = time.monotonic()
+        return False
 
-# Optional JIRA import - only import if available
-JIRA_AVAILABLE = False
-JIRA = None
-
-try:
-    from jira import JIRA  # type: ignore[import-untyped]
-    JIRA_AVAILABLE = True
-except ImportError as e:
-    JIRA_AVAILABLE = False
-    JIRA = None
-    import_error = str(e)
-except Exception as e:
-    # Handle any other import errors
-    JIRA_AVAILABLE = False
-    JIRA = None
-    import_error = str(e)
 
 class SlackNotifier:
     """Slack notification agent for error reporting"""
     
     def __init__(self, webhook_url: str):
         self.webhook_url = webhook_url
+        self.breaker = CircuitBreaker("Slack")
+        # Kept for the notifier's lifetime so repeat sends reuse the TLS connection
+        self._client = httpx.Client(
+            http2=_HTTP2_AVAILABLE,
+            timeout=SLACK_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=4)
+        )
     
     def send_error_notification(
         self,
@@ -36,13 +156,7 @@ class SlackNotifier:
         """Send error notification to Slack"""
         
         # Determine color based on severity
-        color_map = {
-            'Critical': '#FF0000',
-            'High': '#FF6B6B',
-            'Medium': '#FFA500',
-            'Low': '#FFD700'
-        }
-        color = color_map.get(severity, '#808080')
+        color = _SLACK_SEVERITY_COLORS.get(severity, '#808080')
         
         # Format causes
         causes_text = ""
@@ -100,23 +214,92 @@ class SlackNotifier:
         }
         
         try:
-            response = requests.post(
-                self.webhook_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
-            response.raise_for_status()
+            with self.breaker:
+                _retry(lambda: self._post(payload))
             return True
+        except CircuitOpenError:
+            raise  # Surface why nothing was sent
         except Exception as e:
             print(f"Slack notification error: {str(e)}")
             return False
+    
+    def _post(self, payload: Dict[str, Any]) -> None:
+        """POST payload to the webhook; transient failures raise SlackTransientError"""
+        response = self._client.post(self.webhook_url, json=payload)
+        if response.status_code in _SLACK_TRANSIENT_STATUSES:
+            raise SlackTransientError(
+                response.status_code,
+                _parse_retry_after(response.headers.get('Retry-After'))
+            )
+        response.raise_for_status()
+
+
+# (connect, read) timeout in seconds and retry budget for JIRA API calls
+JIRA_TIMEOUT = (3.05, 30)
+JIRA_MAX_RETRIES = 3
+# Longest wait (seconds) honored from Retry-After / rate-limit headers, as for Slack
+JIRA_RETRY_AFTER_CAP = 30.0
+
+# Transient statuses retried with exponential backoff (honoring Retry-After).
+# 5xx only for idempotent methods: a POST that hit a 5xx may already have
+# created the issue. A 429 was never processed, so it is retried for POST too.
+_JIRA_RETRY_STATUSES = (429, 500, 502, 503, 504)
+_JIRA_RETRY_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+# JIRA priority per severity
+_JIRA_PRIORITIES = MappingProxyType({
+    'Critical': 'Highest',
+    'High': 'High',
+    'Medium': 'Medium',
+    'Low': 'Low'
+})
 
 
+class _JiraRetry(Retry):
+    """urllib3 Retry that also understands JIRA Cloud's rate-limit headers.
+    
+    Retry-After wins when present. Otherwise a throttled response's
+    X-RateLimit-Interval-Seconds / X-RateLimit-FillRate gives the time until
+    the token bucket refills. With neither, urllib3 falls back to backoff.
+    Either wait is capped at JIRA_RETRY_AFTER_CAP.
+    Rate-limited (429) ticket POSTs are retried as well; see _JIRA_RETRY_METHODS.
+    """
+    
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429 and method and method.upper() == 'POST':
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+    
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            retry_after = self._rate_limit_wait(response)
+        # A large server hint must not park a notify worker for minutes
+        return None if retry_after is None else min(JIRA_RETRY_AFTER_CAP, retry_after)
+    
+    @staticmethod
+    def _rate_limit_wait(response) -> Optional[float]:
+        """Seconds until JIRA's token bucket refills, from its X-RateLimit-* headers"""
+        interval = response.headers.get('X-RateLimit-Interval-Seconds')
+        fill_rate = response.headers.get('X-RateLimit-FillRate')
+        if not (interval and fill_rate):
+            return None
+        try:
+            return float(interval) / max(1.0, float(fill_rate))
+        except ValueError:
+            return None
+
 class JIRANotifier:
     """JIRA notification agent for creating error tickets"""
     
-    def __init__(self, server: str, email: str, api_token: str):
+    def __init__(
+        self,
+        server: str,
+        email: str,
+        api_token: str,
+        timeout=JIRA_TIMEOUT,
+        max_retries: int = JIRA_MAX_RETRIES
+    ):
         # Re-check JIRA availability at runtime
         import sys
         try:
@@ -141,7 +324,10 @@ class JIRANotifier:
         self.server = server
         self.email = email
         self.api_token = api_token
+        self.timeout = timeout
+        self.max_retries = max_retries
         self.jira = None
+        self.breaker = CircuitBreaker("JIRA")
         self._connect()
     
     def _connect(self):
@@ -149,10 +335,24 @@ class JIRANotifier:
         try:
             self.jira = self.JIRAClass(
                 server=self.server,
-                basic_auth=(self.email, self.api_token)
+                basic_auth=(self.email, self.api_token),
+                timeout=self.timeout,  # A stalled server can't hang the caller
+                max_retries=0  # Retries are done once, by the adapter below
             )
         except Exception as e:
             raise Exception(f"Failed to connect to JIRA: {str(e)}")
+        
+        retry = _JiraRetry(
+            total=self.max_retries,
+            backoff_factor=1.0,
+            status_forcelist=_JIRA_RETRY_STATUSES,
+            allowed_methods=_JIRA_RETRY_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(max_retries=retry)
+        self.jira._session.mount('https://', adapter)
+        self.jira._session.mount('http://', adapter)
     
     def test_connection(self, project_key: str = None) -> Dict[str, Any]:
         """Test JIRA connection and permissions"""
@@ -249,8 +449,23 @@ class JIRANotifier:
         log_content: str = "",
         issue_type: str = "Task"
     ) -> Optional[Dict]:
-        """Create a JIRA ticket for the error"""
-        
+        """Create a JIRA ticket for the error (fails fast while JIRA is down)"""
+        with self.breaker:
+            return self._create_error_ticket(
+                project_key, error_type, severity, causes,
+                selected_solution, log_content, issue_type
+            )
+    
+    def _create_error_ticket(
+        self,
+        project_key: str,
+        error_type: str,
+        severity: str,
+        causes: List[Dict],
+        selected_solution: Dict,
+        log_content: str,
+        issue_type: str
+    ) -> Optional[Dict]:
         if not self.jira:
             raise Exception("JIRA connection not established")
         
@@ -333,13 +548,7 @@ h2. Log Content (Preview)
 """
         
         # Map severity to JIRA priority
-        priority_map = {
-            'Critical': 'Highest',
-            'High': 'High',
-            'Medium': 'Medium',
-            'Low': 'Low'
-        }
-        priority = priority_map.get(severity, 'Medium')
+        priority = _JIRA_PRIORITIES.get(severity, 'Medium')
         
         # Create issue
         try: